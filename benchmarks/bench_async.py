@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+'''
+    AsyncScopus against Scopus on a thread pool, both sending author
+    retrievals to a local aiohttp server that answers with the recorded
+    fixtures after --latency seconds. Requires aiohttp.
+
+        python benchmarks/bench_async.py [--requests 2000] [--latency 0.05]
+'''
+
+import asyncio, json, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from common import arguments, best_of
+from pyscopus import APIURI, Scopus, AsyncScopus
+from pyscopus.transport import Transport, _fixture_name
+from payloads import AUTHOR_IDS
+
+HOSTS = ('http://api.elsevier.com', 'https://api.elsevier.com')
+
+class StubServer(object):
+    '''
+        Local HTTP server replaying the fixtures of path. The Scopus URLs
+        are served under /http/... and /https/..., see redirect.
+    '''
+
+    def __init__(self, path, latency):
+        self.latency = latency
+        self.fixtures = dict()
+        for name in os.listdir(path):
+            with open(os.path.join(path, name)) as f:
+                self.fixtures[name] = json.load(f)
+        self.port = None
+        self._started = threading.Event()
+
+    async def handle(self, request):
+        from aiohttp import web
+        scheme, path = request.path[1:].split('/', 1)
+        url = '%s://api.elsevier.com/%s' %(scheme, path)
+        fixture = self.fixtures.get(_fixture_name(url, dict(request.query)))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if fixture is None:
+            return web.Response(status=404, text='{}', content_type='application/json')
+        return web.Response(status=fixture['status_code'], text=fixture['text'],
+                            content_type='application/json')
+
+    async def _serve(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0, backlog=1024)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        while True:
+            await asyncio.sleep(3600)
+
+    def start(self):
+        thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+        thread.start()
+        self._started.wait()
+        return 'http://127.0.0.1:%i' %self.port
+
+def redirect(base):
+    ''' point the APIURI constants to the stub server at base '''
+    for name in dir(APIURI):
+        value = getattr(APIURI, name)
+        for host in HOSTS:
+            if isinstance(value, str) and value.startswith(host):
+                scheme = host.split(':')[0]
+                setattr(APIURI, name, '%s/%s%s' %(base, scheme, value[len(host):]))
+
+def threaded(author_id_list, workers):
+    scopus = Scopus('stub', transport=Transport(pool_maxsize=workers, max_retries=0))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(scopus.retrieve_author, author_id_list))
+    scopus.transport.close()
+
+async def concurrent(author_id_list, limit):
+    async with AsyncScopus('stub', limit=limit, max_retries=0) as scopus:
+        await asyncio.gather(*[scopus.retrieve_author(author_id) for author_id in author_id_list])
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     requests=(2000, 'author retrievals per run'),
+                     latency=(0.05, 'seconds the server waits before answering'))
+    redirect(StubServer(args.fixtures, args.latency).start())
+    author_id_list = [AUTHOR_IDS[i % 3] for i in range(args.requests)]
+
+    for concurrency in (10, 50, 200):
+        thread_seconds = best_of(lambda: threaded(author_id_list, concurrency), args.repeat)
+        async_seconds = best_of(lambda: asyncio.run(concurrent(author_id_list, concurrency)),
+                                args.repeat)
+        print('%4i in flight  threads %8.0f ms %8.0f req/s   asyncio %8.0f ms %8.0f req/s'
+              %(concurrency, 1000*thread_seconds, args.requests/thread_seconds,
+                1000*async_seconds, args.requests/async_seconds))
+
+if __name__ == '__main__':
+    main()
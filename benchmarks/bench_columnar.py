@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+'''
+    Columnar search page parser (_parse_articles/_parse_authors) against the
+    per-row parser it replaced, which built one pd.Series per entry and a
+    data frame from the list of Series. The per-row parser is kept here as
+    the baseline.
+
+        python benchmarks/bench_columnar.py [--records 10000] [--fixtures DIR]
+'''
+
+from common import arguments, load_fixtures, payloads, search_entries, cycle, best_of, report
+from pyscopus import APIURI
+from pyscopus.utils import _parse_affiliation, _parse_articles, _parse_authors
+
+def _parse_author(entry):
+    import pandas as pd
+    author_id = entry['dc:identifier'].split(':')[-1]
+    lastname = entry['preferred-name']['surname']
+    firstname = entry['preferred-name']['given-name']
+    doc_count = int(entry['document-count'])
+    # affiliations
+    if 'affiliation-current' in entry:
+        affil = entry['affiliation-current']
+        try:
+            institution_name = affil['affiliation-name']
+        except:
+            institution_name = None
+        try:
+            institution_id = affil['affiliation-id']
+        except:
+            institution_id = None
+    else:
+        institution_name = None
+        institution_id = None
+    #city = affil.find('affiliation-city').text
+    #country = affil.find('affiliation-country').text
+    #affiliation = institution + ', ' + city + ', ' + country
+
+    return pd.Series({'author_id': author_id, 'name': firstname + ' ' + lastname, 'document_count': doc_count,\
+            'affiliation': institution_name, 'affiliation_id': institution_id})
+
+def _parse_article(entry):
+    import pandas as pd
+    try:
+        scopus_id = entry['dc:identifier'].split(':')[-1]
+    except:
+        scopus_id = None
+    try:
+        title = entry['dc:title']
+    except:
+        title = None
+    try:
+        publicationname = entry['prism:publicationName']
+    except:
+        publicationname = None
+    try:
+        issn = entry['prism:issn']
+    except:
+        issn = None
+    try:
+        isbn = entry['prism:isbn']
+    except:
+        isbn = None
+    try:
+        eissn = entry['prism:eIssn']
+    except:
+        eissn = None
+    try:
+        volume = entry['prism:volume']
+    except:
+        volume = None
+    try:
+        pagerange = entry['prism:pageRange']
+    except:
+        pagerange = None
+    try:
+        coverdate = entry['prism:coverDate']
+    except:
+        coverdate = None
+    try:
+        doi = entry['prism:doi']
+    except:
+        doi = None
+    try:
+        citationcount = int(entry['citedby-count'])
+    except:
+        citationcount = None
+    try:
+        affiliation = _parse_affiliation(entry['affiliation'])
+    except:
+        affiliation = None
+    try:
+        aggregationtype = entry['prism:aggregationType']
+    except:
+        aggregationtype = None
+    try:
+        sub_dc = entry['subtypeDescription']
+    except:
+        sub_dc = None
+    try:
+        author_entry = entry['author']
+        author_id_list = [auth_entry['authid'] for auth_entry in author_entry]
+    except:
+        author_id_list = list()
+    try:
+        link_list = entry['link']
+        full_text_link = None
+        for link in link_list:
+            if link['@ref'] == 'full-text':
+                full_text_link = link['@href']
+    except:
+        full_text_link = None
+
+    return pd.Series({'scopus_id': scopus_id, 'title': title, 'publication_name':publicationname,\
+            'issn': issn, 'isbn': isbn, 'eissn': eissn, 'volume': volume, 'page_range': pagerange,\
+            'cover_date': coverdate, 'doi': doi,'citation_count': citationcount, 'affiliation': affiliation,\
+            'aggregation_type': aggregationtype, 'subtype_description': sub_dc, 'authors': author_id_list,\
+            'full_text': full_text_link})
+
+def per_row(parse_entry, entries, page_size=25):
+    import pandas as pd
+    return [pd.DataFrame([parse_entry(entry) for entry in entries[start:start+page_size]])
+            for start in range(0, len(entries), page_size)]
+
+def columnar(parse_entries, entries, page_size=25):
+    return [parse_entries(entries[start:start+page_size])
+            for start in range(0, len(entries), page_size)]
+
+def same_frames(df_list, other_df_list):
+    import pandas as pd
+    try:
+        pd.testing.assert_frame_equal(pd.concat(df_list, ignore_index=True),
+                                      pd.concat(other_df_list, ignore_index=True), check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     records=(10000, 'records parsed per case'))
+    fixtures = load_fixtures(args.fixtures)
+    for name, url, parse_entry, parse_entries in (
+            ('articles', APIURI.SEARCH, _parse_article, _parse_articles),
+            ('authors', APIURI.SEARCH_AUTHOR, _parse_author, _parse_authors)):
+        recorded = search_entries(payloads(fixtures, url))
+        if len(recorded) == 0:
+            continue
+        print('%s: same data frame from both parsers: %s'
+              %(name, same_frames(per_row(parse_entry, recorded), columnar(parse_entries, recorded))))
+        entries = cycle(recorded, args.records)
+        row_seconds = best_of(lambda: per_row(parse_entry, entries), args.repeat)
+        column_seconds = best_of(lambda: columnar(parse_entries, entries), args.repeat)
+        report('%s, per-row Series (baseline)' %name, len(entries), row_seconds)
+        report('%s, columnar' %name, len(entries), column_seconds)
+        print('%s: x%.1f faster' %(name, row_seconds/column_seconds))
+
+if __name__ == '__main__':
+    main()
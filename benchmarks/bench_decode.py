@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+    Decoding of recorded article search pages, alone and followed by the
+    search parser: json, orjson and msgspec to dicts (_parse_search_page)
+    against the msgspec decoder of search_page_decoder, which materializes
+    only the fields read by _parse_search_page_struct.
+
+        python benchmarks/bench_decode.py [--records 10000] [--fixtures DIR]
+'''
+
+import json
+from common import arguments, load_fixtures, cycle, best_of, report
+from pyscopus import APIURI
+from pyscopus.decoding import search_page_decoder
+from pyscopus.utils import _parse_search_page, _parse_search_page_struct
+
+def decoders():
+    ''' (name, function decoding bytes to dicts) of the installed JSON libraries '''
+    yield 'json', lambda content: json.loads(content.decode('utf-8'))
+    try:
+        import orjson
+        yield 'orjson', orjson.loads
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        yield 'msgspec', msgspec.json.decode
+    except ImportError:
+        pass
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     records=(10000, 'records decoded per case'))
+    pages = [text.encode('utf-8') for url, text in load_fixtures(args.fixtures)
+             if url == APIURI.SEARCH and '"error"' not in text]
+    sizes = [len(json.loads(page)['search-results']['entry']) for page in pages]
+    n_pages = max(1, int(round(args.records * len(pages) / float(sum(sizes)))))
+    pages, n_records = cycle(pages, n_pages), sum(cycle(sizes, n_pages))
+
+    results = list()
+    for name, decode in decoders():
+        results.append((name, best_of(lambda: [decode(page) for page in pages], args.repeat)))
+        results.append(('%s + _parse_search_page' %name, best_of(
+            lambda: [_parse_search_page(decode(page), 1, 'raw') for page in pages], args.repeat)))
+    decoder = search_page_decoder()
+    if decoder is not None:
+        results.append(('msgspec struct', best_of(lambda: [decoder.decode(page) for page in pages],
+                                                  args.repeat)))
+        results.append(('msgspec struct + _parse_search_page_struct', best_of(
+            lambda: [_parse_search_page_struct(decoder.decode(page), 'raw') for page in pages],
+            args.repeat)))
+
+    base = dict(results)
+    for name, seconds in results:
+        report(name, n_records, seconds)
+    for name, seconds in results:
+        reference = 'json + _parse_search_page' if '+' in name else 'json'
+        print('%-48s x%.2f against %s' %(name, base[reference]/seconds, reference))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+    Memory held by parsed search and citation results: one pd.Series per
+    record (the former per-row parser), dicts (output='raw'), __slots__ records
+    (output='records') and one data frame, measured with tracemalloc plus
+    the Arrow memory pool (string columns of pandas >= 3).
+
+        python benchmarks/bench_memory.py [--records 20000] [--fixtures DIR]
+'''
+
+import gc, tracemalloc
+from common import arguments, load_fixtures, payloads, search_entries, cycle
+from bench_columnar import _parse_article, _parse_author
+from pyscopus import APIURI
+from pyscopus.records import to_frame
+from pyscopus.utils import _parse_articles, _parse_authors, _parse_citation
+
+def arrow_allocated():
+    try:
+        import pyarrow
+    except ImportError:
+        return 0
+    return pyarrow.total_allocated_bytes()
+
+def allocated(fn):
+    ''' bytes still allocated once fn has returned, with its result alive '''
+    gc.collect()
+    arrow_start = arrow_allocated()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] + arrow_allocated() - arrow_start
+    tracemalloc.stop()
+    del result
+    return size
+
+def report(name, n_records, size):
+    print('%-40s %8i records %10.1f MB %8i bytes/record'
+          %(name, n_records, size/2.0**20, size/n_records))
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     records=(20000, 'records kept in memory'))
+    fixtures = load_fixtures(args.fixtures)
+    for name, url, parse_entry, parse_entries in (
+            ('Article', APIURI.SEARCH, _parse_article, _parse_articles),
+            ('Author', APIURI.SEARCH_AUTHOR, _parse_author, _parse_authors)):
+        entries = cycle(search_entries(payloads(fixtures, url)), args.records)
+        report('%s, pd.Series per record' %name, len(entries),
+               allocated(lambda: [parse_entry(entry) for entry in entries]))
+        for output in ('raw', 'records', 'frame'):
+            report('%s, output=%s' %(name, output), len(entries),
+                   allocated(lambda: parse_entries(entries, output)))
+
+    js_list = payloads(fixtures, APIURI.CITATION)
+    if js_list:
+        years = js_list[0]['abstract-citations-response']['citeColumnTotalXML']\
+                ['citeCountHeader']['columnHeading']
+        year_range = (int(years[0]['$']), int(years[-1]['$']))
+        n_rows = len(_parse_citation(js_list[0], year_range, 'raw'))
+        js_list = cycle(js_list[:1], max(1, args.records // n_rows))
+        for output in ('raw', 'records'):
+            report('CitationRow, output=%s' %output, n_rows*len(js_list),
+                   allocated(lambda: [row for js in js_list
+                                      for row in _parse_citation(js, year_range, output)]))
+        report('CitationRow, output=frame', n_rows*len(js_list),
+               allocated(lambda: to_frame([row for js in js_list
+                                           for row in _parse_citation(js, year_range, 'records')])))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+'''
+    Parse throughput (records/s) of every _parse_* function of pyscopus.utils
+    on recorded payloads, repeated to --records records. Decoding is timed
+    by bench_decode.py.
+
+        python benchmarks/bench_parse.py [--records 10000] [--fixtures DIR]
+'''
+
+import json
+from common import arguments, load_fixtures, payloads, search_entries, cycle, best_of, report
+from pyscopus import APIURI
+from pyscopus.decoding import search_page_decoder
+from pyscopus.utils import _parse_articles, _parse_authors, _parse_search_page,\
+        _parse_search_page_struct, _parse_affiliation, _parse_citation, _parse_citation_panel,\
+        _parse_author_retrieval, _parse_author_retrieval_list, _parse_author_affiliation,\
+        _parse_affiliation_history, _parse_abstract_retrieval, _parse_serial, _parse_aff
+
+def page_size(js):
+    return len(search_entries([js]))
+
+def citation_size(js):
+    return len(js['abstract-citations-response']['citeInfoMatrix']['citeInfoMatrixXML']
+               ['citationMatrix']['citeInfo'])
+
+def citation_year_range(js):
+    years = js['abstract-citations-response']['citeColumnTotalXML']['citeCountHeader']['columnHeading']
+    return int(years[0]['$']), int(years[-1]['$'])
+
+def per_payload(js_list, size, n_records):
+    ''' payloads repeated until they hold about n_records records, and their record count '''
+    js_list = [js for js in js_list if size(js) > 0]
+    if len(js_list) == 0:
+        raise ValueError('no fixture for this benchmark')
+    sizes = [size(js) for js in js_list]
+    n_payloads = max(1, int(round(n_records * len(js_list) / float(sum(sizes)))))
+    return cycle(js_list, n_payloads), sum(cycle(sizes, n_payloads))
+
+def cases(fixtures, n_records):
+    ''' (name, function, number of records) of every benchmark '''
+    import numpy as np
+
+    pages = payloads(fixtures, APIURI.SEARCH)
+    entries = cycle(search_entries(pages), n_records)
+    page_list, n_page_records = per_payload(pages, page_size, n_records)
+    decoder = search_page_decoder()
+    authors = cycle(search_entries(payloads(fixtures, APIURI.SEARCH_AUTHOR)), n_records)
+    # _parse_affiliation raises on incomplete affiliations (see _parse_affiliation_or_none)
+    affiliation_lists = cycle([entry['affiliation'] for entry in search_entries(pages)
+                               if 'affiliation' in entry and
+                               all('affiliation-city' in affil for affil in entry['affiliation'])],
+                              n_records)
+
+    citation_list, n_citations = per_payload(payloads(fixtures, APIURI.CITATION), citation_size,
+                                             n_records)
+    year_range = citation_year_range(citation_list[0])
+    panel = np.zeros((max(citation_size(js) for js in citation_list),
+                      year_range[1] - year_range[0] + 4), dtype=np.int64)
+
+    author_list = payloads(fixtures, APIURI.AUTHOR + '/', prefix=True)
+    multi_author_list, n_multi_authors = per_payload(
+        payloads(fixtures, APIURI.AUTHOR_MULTI),
+        lambda js: len(js['author-retrieval-response-list']['author-retrieval-response']), n_records)
+    history_list = [js['author-retrieval-response'][0]['author-profile']['affiliation-history']
+                    ['affiliation'] for js in author_list
+                    if 'affiliation-history' in js['author-retrieval-response'][0]['author-profile']]
+    history_entries = [entry for history in history_list for entry in history]
+    abstracts = cycle(payloads(fixtures, APIURI.ABSTRACT + '/', prefix=True), n_records)
+    serials = cycle(payloads(fixtures, APIURI.SERIAL_RETRIEVAL, prefix=True), n_records)
+    affiliations = cycle([js['affiliation-retrieval-response']
+                          for js in payloads(fixtures, APIURI.AFFL_RETRIEVAL, prefix=True)], n_records)
+
+    yield '_parse_articles (frame)', lambda: _parse_articles(entries), n_records
+    yield '_parse_articles (records)', lambda: _parse_articles(entries, 'records'), n_records
+    yield '_parse_articles (raw)', lambda: _parse_articles(entries, 'raw'), n_records
+    yield '_parse_search_page', lambda: [_parse_search_page(js, 1, 'raw')
+                                         for js in page_list], n_page_records
+    if decoder is not None:
+        structs = [decoder.decode(json.dumps(js)) for js in page_list]
+        yield '_parse_search_page_struct', lambda: [_parse_search_page_struct(page, 'raw')
+                                                    for page in structs], n_page_records
+    yield '_parse_authors (frame)', lambda: _parse_authors(authors), n_records
+    yield '_parse_authors (raw)', lambda: _parse_authors(authors, 'raw'), n_records
+    yield '_parse_affiliation', lambda: [_parse_affiliation(affiliation)
+                                         for affiliation in affiliation_lists], n_records
+    yield '_parse_citation (frame)', lambda: [_parse_citation(js, year_range)
+                                              for js in citation_list], n_citations
+    yield '_parse_citation (raw)', lambda: [_parse_citation(js, year_range, 'raw')
+                                            for js in citation_list], n_citations
+    yield '_parse_citation_panel', lambda: [_parse_citation_panel(js, year_range, panel)
+                                            for js in citation_list], n_citations
+    if author_list:
+        single_authors = cycle(author_list, n_records)
+        yield '_parse_author_retrieval', lambda: [_parse_author_retrieval(js)
+                                                  for js in single_authors], n_records
+    yield '_parse_author_retrieval_list', lambda: [_parse_author_retrieval_list(js)
+                                                   for js in multi_author_list], n_multi_authors
+    if history_entries:
+        history_entries = cycle(history_entries, n_records)
+        yield '_parse_author_affiliation', lambda: [_parse_author_affiliation(entry)
+                                                    for entry in history_entries], n_records
+        yield '_parse_affiliation_history', lambda: _parse_affiliation_history(history_entries), n_records
+    yield '_parse_abstract_retrieval', lambda: [_parse_abstract_retrieval(js)
+                                                for js in abstracts], n_records
+    yield '_parse_serial (raw)', lambda: [_parse_serial(js, 'raw') for js in serials], n_records
+    yield '_parse_aff', lambda: [_parse_aff(js) for js in affiliations], n_records
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     records=(10000, 'records parsed per case'))
+    fixtures = load_fixtures(args.fixtures)
+    for name, fn, n_records in cases(fixtures, args.records):
+        report(name, n_records, best_of(fn, args.repeat))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+'''
+    Scaling of search, citation and affiliation history frames from 100 to
+    100k records. The time per record stays flat when frames are built once
+    from the collected records, and grows with n when every page or row is
+    appended to the frame built so far.
+
+        python benchmarks/bench_scaling.py [--max-records 100000] [--fixtures DIR]
+'''
+
+import json
+from common import arguments, load_fixtures, payloads, best_of
+from pyscopus import APIURI, Scopus
+from pyscopus.transport import RecordedResponse
+from pyscopus.utils import _parse_citation, _parse_affiliation_history
+
+class PageTransport(object):
+    '''
+        Serve one recorded search page (25 entries) for every start offset,
+        as if the search had n_records results
+    '''
+
+    def __init__(self, js, n_records):
+        js = json.loads(json.dumps(js))
+        js['search-results']['opensearch:totalResults'] = str(n_records)
+        self.text = json.dumps(js)
+
+    def get(self, url, params=None):
+        return RecordedResponse(url, 200, {}, self.text)
+
+def citation_payload(js_list, n_records):
+    ''' one citation overview response with n_records papers, repeating the recorded ones '''
+    cite_info_list = [cite_info for js in js_list for cite_info in
+                      js['abstract-citations-response']['citeInfoMatrix']['citeInfoMatrixXML']
+                      ['citationMatrix']['citeInfo'] if 'cc' in cite_info]
+    js = json.loads(json.dumps(js_list[0]))
+    js['abstract-citations-response']['citeInfoMatrix']['citeInfoMatrixXML']['citationMatrix']\
+            ['citeInfo'] = [cite_info_list[i % len(cite_info_list)] for i in range(n_records)]
+    return js
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     max_records=(100000, 'largest number of records'))
+    fixtures = load_fixtures(args.fixtures)
+    page = [js for js in payloads(fixtures, APIURI.SEARCH)
+            if len(js['search-results']['entry']) == 25][0]
+    citation_list = payloads(fixtures, APIURI.CITATION)
+    years = citation_list[0]['abstract-citations-response']['citeColumnTotalXML']\
+            ['citeCountHeader']['columnHeading']
+    year_range = (int(years[0]['$']), int(years[-1]['$']))
+    history = [entry for js in payloads(fixtures, APIURI.AUTHOR + '/', prefix=True)
+               for entry in js['author-retrieval-response'][0]['author-profile']
+               .get('affiliation-history', {}).get('affiliation', [])]
+
+    sizes = [n for n in (100, 1000, 10000, 100000, 1000000) if n <= args.max_records]
+    cases = [('Scopus.search', lambda n: (lambda: Scopus('replay', transport=PageTransport(page, n))
+                                          .search('query', count=n))),
+             ('_parse_citation', lambda n: (lambda js=citation_payload(citation_list, n):
+                                            _parse_citation(js, year_range)))]
+    if history:
+        cases.append(('_parse_affiliation_history',
+                      lambda n: (lambda entries=[history[i % len(history)] for i in range(n)]:
+                                 _parse_affiliation_history(entries))))
+    for name, make in cases:
+        base = None
+        for n in sizes:
+            seconds = best_of(make(n), args.repeat if n < 100000 else 1)
+            per_record = 1e6*seconds/n
+            if base is None:
+                base = per_record
+            print('%-28s %8i records %10.1f ms %8.2f us/record  x%.2f'
+                  %(name, n, 1000*seconds, per_record, per_record/base))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+'''
+    End-to-end Scopus.search latency through ReplayTransport: request,
+    decoding, parsing and concatenation of every page, with a simulated
+    round trip of --latency seconds per request.
+
+        python benchmarks/bench_search.py [--latency 0.05] [--fixtures DIR]
+
+    With fixtures recorded from Scopus, give the recorded --query and --count.
+'''
+
+from common import arguments, best_of
+from pyscopus import Scopus
+from pyscopus.transport import ReplayTransport
+from payloads import QUERY, N_ARTICLES
+
+def main():
+    args = arguments(__doc__.strip().split('\n')[0],
+                     latency=(0.05, 'seconds slept per request'),
+                     query=(QUERY, 'recorded article search'),
+                     count=(N_ARTICLES, 'recorded number of results'))
+    for latency in sorted(set([0.0, args.latency])):
+        transport = ReplayTransport(args.fixtures, latency=latency)
+        for output in ('frame', 'records', 'raw'):
+            scopus = Scopus('replay', transport=transport, output=output)
+            for workers, cursor in ((1, False), (4, False), (1, True)):
+                seconds = best_of(lambda: scopus.search(args.query, count=args.count,
+                                                        workers=workers, cursor=cursor), args.repeat)
+                print('latency %5.0f ms  output %-8s workers %i  cursor %-5s %10.1f ms'
+                      %(1000*latency, output, workers, cursor, 1000*seconds))
+
+if __name__ == '__main__':
+    main()
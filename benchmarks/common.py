@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+'''
+    Helpers shared by the benchmarks: command line, fixtures and timing.
+
+    The benchmarks run on the fixtures replayed by the tests (tests/fixtures,
+    see tests/record_fixtures.py), or on any directory recorded with
+    RecordingTransport given with --fixtures.
+'''
+
+import argparse, gc, json, os, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from record_fixtures import FIXTURE_PATH
+
+def arguments(description, **options):
+    '''
+        Parse the common options (--fixtures, --repeat) and the extra
+        options given as name=(default, help)
+    '''
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--fixtures', default=FIXTURE_PATH, help='fixture directory')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case, the best is kept')
+    for name, (default, help) in sorted(options.items()):
+        parser.add_argument('--' + name.replace('_', '-'), type=type(default), default=default,
+                            help=help)
+    return parser.parse_args()
+
+def load_fixtures(path):
+    ''' successful fixtures of path, as (url, text) '''
+    fixtures = list()
+    for name in sorted(os.listdir(path)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(path, name)) as f:
+            fixture = json.load(f)
+        if fixture['status_code'] == 200:
+            fixtures.append((fixture['url'], fixture['text']))
+    return fixtures
+
+def payloads(fixtures, url, prefix=False):
+    ''' decoded bodies of the fixtures of url (or of every url starting with it) '''
+    return [json.loads(text) for fixture_url, text in fixtures
+            if fixture_url == url or (prefix and fixture_url.startswith(url))]
+
+def search_entries(js_list):
+    ''' entries of search pages, without the entry of empty results '''
+    return [entry for js in js_list for entry in js['search-results']['entry'] if 'error' not in entry]
+
+def cycle(items, n):
+    ''' n items, repeating items as needed '''
+    if len(items) == 0:
+        raise ValueError('no fixture for this benchmark')
+    return [items[i % len(items)] for i in range(n)]
+
+def best_of(fn, repeat):
+    ''' shortest wall time of repeat calls of fn, in seconds '''
+    times = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def report(name, n_records, seconds):
+    print('%-48s %8i records %10.1f ms %12.0f records/s'
+          %(name, n_records, 1000*seconds, n_records/seconds))
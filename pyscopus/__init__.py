@@ -1,5 +1,14 @@
 import os.path
 from pyscopus.scopus import Scopus
-from pkg_resources import get_distribution, DistributionNotFound
+from pyscopus.transport import Transport, RateLimiter, KeyPool, ScopusHTTPError,\
+        RecordingTransport, ReplayTransport
+from pyscopus.cache import ResponseCache, SingleFlight, MemoryCache
+from pyscopus.metrics import Metrics
+from pyscopus.async_scopus import AsyncScopus
+from pyscopus.harvest import HarvestJob
+from pyscopus.sinks import FileSink
+from pyscopus.index import LocalIndex
+from pyscopus.sync import AuthorSync
+from pyscopus import records
 
 __version__ = '1.0.3a2'
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+'''
+    asyncio counterpart of the Scopus class. Requires aiohttp.
+'''
+
+import asyncio, json, os, random, warnings
+from pyscopus import APIURI
+from pyscopus.transport import RETRY_STATUS, ScopusHTTPError
+from pyscopus.decoding import loads
+from pyscopus.utils import _parse_author_retrieval, _parse_citation, _warn_missing_citations,\
+        _parse_abstract_retrieval, _parse_serial, _parse_aff,\
+        _search_request, _check_cursor, _parse_search_page
+
+class AsyncScopus(object):
+    '''
+        Same API as pyscopus.Scopus, with awaitable methods.
+
+        All requests share one aiohttp connection pool, so thousands of calls
+        can be awaited concurrently (e.g. with asyncio.gather) while at most
+        `limit` connections are open. Use it as an async context manager or
+        call `await close()` when done.
+
+        Parameters
+        ----------
+        apikey : str
+            Elsevier api key. Get it here: https://dev.elsevier.com/index.html
+        session : aiohttp.ClientSession
+            Session used for every request. Default creates one with `limit`
+            connections and `timeout` seconds total timeout.
+        limit : int
+            Max number of open connections.
+        timeout : float
+            Total timeout in seconds for a request.
+        max_retries : int
+            Number of retries for throttled (429/503) responses.
+        backoff : float
+            Base delay in seconds of the jittered exponential backoff.
+        cache : pyscopus.cache.ResponseCache
+            Optional persistent cache, see pyscopus.Scopus.
+        max_wait : float
+            Longest wait (in seconds) before a retry. A response whose
+            Retry-After is longer raises ScopusHTTPError. Default is 60.
+    '''
+
+    def __init__(self, apikey=None, session=None, limit=100, timeout=60,
+                 max_retries=5, backoff=1.0, cache=None, max_wait=60):
+        self.apikey = apikey
+        self.limit = limit
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.max_wait = max_wait
+        self.session = session
+
+    def add_key(self, apikey):
+        self.apikey = apikey
+
+    def _get_session(self):
+        if self.session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError('AsyncScopus requires aiohttp: pip install aiohttp')
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _get_json(self, endpoint, url, params):
+        '''
+            Same as _fetch_json, going through the cache if any
+        '''
+        if self.cache is not None:
+            js = self.cache.get(endpoint, url, params)
+            if js is not None:
+                return js
+        js = await self._fetch_json(url, params)
+        if self.cache is not None:
+            self.cache.set(endpoint, url, params, js)
+        return js
+
+    async def _fetch_json(self, url, params):
+        '''
+            GET url and decode the JSON response, retrying throttled responses.
+            Raises ScopusHTTPError (a ValueError) for non-200 responses.
+        '''
+        # aiohttp only accepts str/int/float parameter values
+        params = {k: v for k, v in params.items() if v is not None}
+        session = self._get_session()
+        attempt = 0
+        while True:
+            async with session.get(url, params=params) as r:
+                if r.status in RETRY_STATUS and attempt < self.max_retries:
+                    try:
+                        delay = float(r.headers['Retry-After'])
+                    except (KeyError, ValueError):
+                        delay = min(self.backoff * 2**attempt * random.uniform(0.5, 1.5),
+                                    self.max_wait)
+                    if not 0 <= delay <= self.max_wait:
+                        raise ScopusHTTPError(r.status, url)
+                elif r.status != 200:
+                    raise ScopusHTTPError(r.status, url)
+                else:
+                    return loads(await r.read())
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _search_page(self, query, type_, view, index=0, cursor=None):
+        url, par = _search_request(self.apikey, query, type_, view, index, cursor)
+        js = await self._fetch_json(url, par)
+        return _parse_search_page(js, type_)
+
+    async def search(self, query, count=100, type_=1, view='COMPLETE', cursor=False):
+        '''
+            See pyscopus.Scopus.search. All pages after the first are
+            requested at once, bounded by the connection pool.
+        '''
+        import pandas as pd
+
+        if type(count) is not int:
+            raise ValueError("%s is not a valid input for the number of entries to return." %count)
+        _check_cursor(type_, cursor)
+
+        if cursor:
+            page_list = list()
+            n_records = 0
+            next_cursor = '*'
+            while n_records < count:
+                page_df, total_count, current_cursor = await self._search_page(query, 1, view,
+                                                                               cursor=next_cursor)
+                count = min(count, total_count)
+                page_list.append(page_df)
+                n_records += page_df.shape[0]
+                if page_df.shape[0] == 0 or current_cursor is None or current_cursor == next_cursor:
+                    break
+                next_cursor = current_cursor
+            return pd.concat(page_list, ignore_index=True)[:count]
+
+        page_df, total_count, _ = await self._search_page(query, type_, view)
+        count = min(count, total_count)
+
+        page_list = await asyncio.gather(*[self._search_page(query, type_, view, index=index)
+                                           for index in range(25, count, 25)])
+        page_list = [page_df] + [page[0] for page in page_list]
+        return pd.concat(page_list, ignore_index=True)[:count]
+
+    async def search_author(self, query, view='STANDARD', count=10):
+        return await self.search(query, count, type_=2, view=view)
+
+    async def search_author_publication(self, author_id, count=10000, cursor=False):
+        query = 'au-id(%s)'%author_id
+        return await self.search(query, count, cursor=cursor)
+
+    async def retrieve_author(self, author_id):
+        par = {'apikey': self.apikey, 'httpAccept': 'application/json'}
+        js = await self._get_json('author', '%s/%s'%(APIURI.AUTHOR, author_id), par)
+        try:
+            return _parse_author_retrieval(js)
+        except:
+            raise ValueError('Author %s not found!' %author_id)
+
+    async def retrieve_abstract(self, scopus_id, download_path=None, view='FULL'):
+        '''
+            See pyscopus.Scopus.retrieve_abstract (same arguments).
+        '''
+        par = {'apikey': self.apikey, 'httpAccept': 'application/json', 'view': view}
+        js = await self._get_json('abstract', '%s/%s'%(APIURI.ABSTRACT, scopus_id), par)
+        if download_path is not None:
+            os.makedirs(download_path, exist_ok=True)
+            with open(os.path.join(download_path, scopus_id+'.json'), 'w') as f:
+                json.dump(js, f)
+        try:
+            return _parse_abstract_retrieval(js)
+        except:
+            raise ValueError('Abstract for %s not found!' %scopus_id)
+
+    async def retrieve_citation(self, scopus_id_array, year_range, chunk_size=25):
+        '''
+            See pyscopus.Scopus.retrieve_citation. All chunks are requested at once.
+        '''
+        import pandas as pd
+        date = '%i-%i' %(year_range[0], year_range[1])
+        scopus_id_list = [str(scopus_id) for scopus_id in scopus_id_array]
+
+        async def fetch_chunk(index):
+            par = {'apikey': self.apikey, 'scopus_id': ','.join(scopus_id_list[index:index+chunk_size]),
+                   'httpAccept':'application/json', 'date': date}
+            js = await self._fetch_json(APIURI.CITATION, par)
+            return _parse_citation(js, year_range)
+
+        citation_df_list = await asyncio.gather(*[fetch_chunk(index) for index in
+                                                  range(0, len(scopus_id_list), chunk_size)])
+        _warn_missing_citations(sum(len(citation_df) for citation_df in citation_df_list),
+                                len(scopus_id_list))
+        if len(citation_df_list) == 0:
+            return pd.DataFrame()
+        return pd.concat(citation_df_list, ignore_index=True)
+
+    async def search_serial(self, title, view='CITESCORE', count=200):
+        if type(count) != int or count > 200:
+            warnings.warn("count corrected to be 200", UserWarning)
+            count = 200
+        if view not in ['STANDARD', 'ENHANCED', 'CITESCORE']:
+            warnings.warn("view corrected to be CITESCORE", UserWarning)
+            view = 'CITESCORE'
+        par = {'apiKey': self.apikey, 'title': title,
+                'count': count, 'view': view}
+        js = await self._get_json('serial_search', APIURI.SERIAL_SEARCH, par)
+        return _parse_serial(js)
+
+    async def retrieve_serial(self, issn, view='CITESCORE'):
+        if view not in ['STANDARD', 'ENHANCED', 'CITESCORE']:
+            warnings.warn("view corrected to be CITESCORE", UserWarning)
+            view = 'CITESCORE'
+        par = {'apiKey': self.apikey, 'view': view}
+        js = await self._get_json('serial', APIURI.SERIAL_RETRIEVAL+issn, par)
+        return _parse_serial(js)
+
+    async def retrieve_affiliation(self, aff_id, view='STANDARD'):
+        par = {'apiKey': self.apikey, 'view': view, 'httpAccept': 'application/json'}
+        js = await self._get_json('affiliation', APIURI.AFFL_RETRIEVAL+aff_id, par)
+        d = _parse_aff(js['affiliation-retrieval-response'])
+        d['aff_id'] = aff_id
+        return d
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+'''
+    Response caching, request coalescing and memoization for Scopus objects
+'''
+
+import inspect, json, sqlite3, threading, time
+from collections import defaultdict, OrderedDict
+
+# parameter names never used as part of a cache key
+UNCACHED_PARAMS = ('apikey', 'apiKey')
+
+class ResponseCache(object):
+    '''
+        On-disk cache of raw JSON responses, backed by SQLite.
+
+        Entries are keyed by endpoint, URL (which carries the id) and request
+        parameters such as view; the api key is never part of the key.
+
+        Parameters
+        ----------
+        path : str
+            SQLite database file. ':memory:' keeps the cache in memory.
+        ttl : int, float or dict
+            Time to live in seconds, either for all endpoints or per endpoint
+            name (e.g. {'abstract': 30*86400, 'author': 7*86400}).
+            Endpoints without a ttl never expire. Default is None.
+        max_size : int
+            Max total size in bytes of the cached payloads. Least recently
+            used entries are evicted beyond it. Default is None (unbounded).
+    '''
+
+    def __init__(self, path='pyscopus_cache.sqlite', ttl=None, max_size=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses '
+                           '(key TEXT PRIMARY KEY, endpoint TEXT, payload TEXT, '
+                           'size INTEGER, created REAL, accessed REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed '
+                           'ON responses (accessed)')
+        self._conn.commit()
+
+    def _ttl(self, endpoint):
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(endpoint)
+        return self.ttl
+
+    @staticmethod
+    def make_key(endpoint, url, params=None):
+        if params is None:
+            params = {}
+        par = sorted((str(k), str(v)) for k, v in params.items() if k not in UNCACHED_PARAMS)
+        return '%s|%s|%s' %(endpoint, url, json.dumps(par))
+
+    def get(self, endpoint, url, params=None):
+        '''
+            Return the cached JSON for this request, or None on a miss
+        '''
+        key = self.make_key(endpoint, url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT payload, created FROM responses WHERE key = ?',
+                                     (key,)).fetchone()
+            ttl = self._ttl(endpoint)
+            if row is not None and ttl is not None and now - row[1] > ttl:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses[endpoint] += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits[endpoint] += 1
+        return json.loads(row[0])
+
+    def set(self, endpoint, url, params, js):
+        key = self.make_key(endpoint, url, params)
+        payload = json.dumps(js)
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                               (key, endpoint, payload, len(payload), now, now))
+            if self.max_size is not None:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total_size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        rows = self._conn.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        for key, size in rows:
+            if total_size <= self.max_size:
+                break
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total_size -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def stats(self):
+        '''
+            Returns
+            -------
+            dict
+                Hits, misses and hit rate per endpoint.
+        '''
+        stats = dict()
+        for endpoint in set(self.hits) | set(self.misses):
+            hits, misses = self.hits[endpoint], self.misses[endpoint]
+            stats[endpoint] = {'hits': hits, 'misses': misses,
+                               'hit_rate': float(hits)/(hits+misses)}
+        return stats
+
+    def close(self):
+        self._conn.close()
+
+class SingleFlight(object):
+    '''
+        Share one in-flight call among concurrent callers with the same key.
+
+        The first caller runs the function; callers arriving while it runs
+        wait and get the same result (the same object, not a copy) or the
+        same exception. Nothing is kept once the call has finished.
+    '''
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class _Call(object):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# method -> inspect.Signature, see MemoryCache.make_key
+_signatures = dict()
+
+class MemoryCache(object):
+    '''
+        Bounded in-process cache of parsed results, least recently used
+        entries evicted first. Unlike ResponseCache nothing is written to
+        disk or decoded again: a hit returns the same object as the first
+        call, so do not modify results in place.
+
+        Parameters
+        ----------
+        max_size : int
+            Max number of entries. Default is 1024.
+        ttl : int or float
+            Time to live in seconds. Default is None (no expiry).
+    '''
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(method, args, kwargs, output=None):
+        '''
+            Key of the call method(self, *args, **kwargs) on a Scopus object
+            with the given output: the arguments are bound to the parameters
+            of method with the defaults applied, so positional, keyword and
+            omitted default arguments give the same key. Raises TypeError if
+            the arguments do not fit method.
+        '''
+        signature = _signatures.get(method)
+        if signature is None:
+            signature = _signatures[method] = inspect.signature(method)
+        bound = signature.bind(None, *args, **kwargs)
+        bound.apply_defaults()
+        # the first argument is self
+        return (method.__name__, output, tuple(bound.arguments.items())[1:])
+
+    def get(self, key):
+        '''
+            Returns
+            -------
+            (True, result) on a hit, (False, None) on a miss
+        '''
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses[key[0]] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits[key[0]] += 1
+        return True, entry[0]
+
+    def set(self, key, result):
+        with self._lock:
+            self._entries[key] = (result, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, method, *args, **kwargs):
+        '''
+            Drop the result of one call of a bound method, e.g.
+            invalidate(scopus.retrieve_author, '7004212771')
+        '''
+        key = self.make_key(method.__func__, args, kwargs, method.__self__.output)
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        '''
+            Returns
+            -------
+            dict
+                Hits, misses and hit rate per method.
+        '''
+        stats = dict()
+        for name in set(self.hits) | set(self.misses):
+            hits, misses = self.hits[name], self.misses[name]
+            stats[name] = {'hits': hits, 'misses': misses,
+                           'hit_rate': float(hits)/(hits+misses)}
+        return stats
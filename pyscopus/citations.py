@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+'''
+    Vectorized indicators on citation panels (see Scopus.retrieve_citation_panel)
+'''
+
+import numpy as np
+import pandas as pd
+
+TOTAL_COLUMNS = ('previous_citation', 'later_citation', 'total_citation')
+
+def year_columns(panel):
+    ''' the per-year columns of panel, in order '''
+    return [column for column in panel.columns if column not in TOTAL_COLUMNS]
+
+def _h_index(counts):
+    # counts: array of papers x curves; h-index of every column at once
+    counts = -np.sort(-counts, axis=0)
+    ranks = np.arange(1, counts.shape[0]+1).reshape(-1, 1)
+    return (counts >= ranks).sum(axis=0)
+
+def h_index(panel, column='total_citation', groups=None):
+    '''
+        h-index of the papers of panel
+
+        Parameters
+        ----------
+        column : str
+            Counts used, 'total_citation' (default) or any column of panel.
+        groups : pandas.Series
+            Optional group (e.g. author id) of each paper, indexed by scopus_id.
+            A paper may appear several times, once per group.
+
+        Returns
+        -------
+        int, or pandas.Series of the h-index of every group if groups is given
+    '''
+    counts = panel[column]
+    if groups is None:
+        return int(_h_index(counts.values.reshape(-1, 1))[0])
+    df = pd.DataFrame({'group': groups.values, 'count': counts.reindex(groups.index).fillna(0).values})
+    rank = df.groupby('group')['count'].rank(method='first', ascending=False)
+    return (df['count'] >= rank).groupby(df['group']).sum().astype(np.int64)
+
+def year_sums(panel):
+    '''
+        Returns
+        -------
+        pandas.Series
+            Citations received by all papers of panel in each year.
+    '''
+    return panel[year_columns(panel)].sum()
+
+def cumulative(panel, include_previous=True):
+    '''
+        Returns
+        -------
+        pandas.DataFrame
+            Citations of each paper received up to each year (inclusive),
+            counting those before the year range if include_previous.
+    '''
+    years = year_columns(panel)
+    counts = np.cumsum(panel[years].values, axis=1)
+    if include_previous:
+        counts += panel['previous_citation'].values.reshape(-1, 1)
+    return pd.DataFrame(counts, index=panel.index, columns=years)
+
+def h_index_curve(panel, include_previous=True):
+    '''
+        Returns
+        -------
+        pandas.Series
+            h-index of the papers of panel at the end of each year, from
+            their cumulative citations (see cumulative).
+    '''
+    counts = cumulative(panel, include_previous)
+    return pd.Series(_h_index(counts.values), index=counts.columns)
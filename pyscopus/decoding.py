@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+'''
+    JSON decoding of responses, faster with orjson or msgspec when installed
+'''
+
+import json
+from pyscopus.utils import ENTRY_ATTRIBUTES
+
+_backend = dict()
+
+def _fast_loads():
+    if 'loads' not in _backend:
+        try:
+            import orjson
+            _backend['loads'] = orjson.loads
+        except ImportError:
+            try:
+                import msgspec
+                _backend['loads'] = msgspec.json.decode
+            except ImportError:
+                _backend['loads'] = None
+    return _backend['loads']
+
+def loads(content):
+    '''
+        Decode JSON bytes or str with orjson, msgspec or json, whichever is
+        available first
+    '''
+    fast_loads = _fast_loads()
+    if fast_loads is not None:
+        return fast_loads(content)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    return json.loads(content)
+
+def decode_response(r, decoder=None):
+    '''
+        Decode the body of a requests.Response-like object.
+
+        With a decoder (see search_page_decoder), only the fields it declares
+        are materialized; if the payload does not fit its schema the body is
+        decoded as plain JSON instead.
+    '''
+    content = getattr(r, 'content', None)
+    if not isinstance(content, bytes):
+        return r.json()
+    if decoder is not None:
+        try:
+            return decoder.decode(content)
+        except ValueError:
+            # msgspec.ValidationError is a ValueError
+            pass
+    return loads(content)
+
+def search_page_decoder():
+    '''
+        msgspec decoder of an article search page that only materializes the
+        fields read by the search parser (see _parse_search_page_struct).
+        None if msgspec is not installed.
+    '''
+    if 'search_page' not in _backend:
+        try:
+            import msgspec
+        except ImportError:
+            _backend['search_page'] = None
+            return None
+        from typing import Any, List, Optional
+
+        def struct(name, fields):
+            # fields: (attribute, JSON key, type)
+            return msgspec.defstruct(name, [(attr, type_, None) for attr, _, type_ in fields],
+                                     rename={attr: key for attr, key, _ in fields})
+
+        # affiliation, author and link lists stay plain JSON, so that missing
+        # keys are handled by the parser as in the dict path
+        Entry = struct('Entry', [(attr, key, Any) for key, attr in ENTRY_ATTRIBUTES.items()])
+        Cursor = struct('Cursor', [('next', '@next', Any)])
+        Results = struct('Results', [('total', 'opensearch:totalResults', Any),
+                                     ('entry', 'entry', Optional[List[Entry]]),
+                                     ('cursor', 'cursor', Optional[Cursor])])
+        Page = struct('Page', [('results', 'search-results', Optional[Results])])
+        _backend['search_page'] = msgspec.json.Decoder(Page)
+    return _backend['search_page']
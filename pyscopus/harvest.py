@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+'''
+    Resumable, checkpointed search harvests
+'''
+
+import json, os
+from pyscopus.records import Article, Author
+from pyscopus.utils import _iter_pages, _check_cursor, _columns_output, _write_atomic
+
+class HarvestJob(object):
+    '''
+        A search whose pages are checkpointed to a local directory.
+
+        Every completed page is written to its own JSON lines file (one
+        record per line, as returned with output='raw') and then recorded in
+        manifest.json, together with the total count (offset
+        pagination) or the next cursor (cursor pagination). Running the same
+        job again only requests the pages missing from the directory, so a
+        harvest interrupted by a crash or an exhausted quota resumes where it
+        stopped.
+
+        Parameters
+        ----------
+        scopus : pyscopus.Scopus
+            Client used for the requests.
+        path : str
+            Checkpoint directory. Created if it does not exist.
+        query, count, type_, view, cursor :
+            See pyscopus.Scopus.search. They are stored in the manifest and
+            must be the same when resuming.
+    '''
+
+    def __init__(self, scopus, path, query, count=100, type_=1, view='COMPLETE', cursor=False):
+        _check_cursor(type_, cursor)
+        self.scopus = scopus
+        self.path = path
+        self.query = query
+        self.count = count
+        self.type_ = type_
+        self.view = view
+        self.cursor = cursor
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self.manifest = self._load_manifest()
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.path, 'manifest.json')
+
+    def _load_manifest(self):
+        job = {'query': self.query, 'count': self.count, 'type_': self.type_,
+               'view': self.view, 'cursor': self.cursor}
+        if not os.path.exists(self._manifest_path):
+            return {'job': job, 'pages': list(), 'n_records': 0, 'total_count': None,
+                    'next_cursor': '*', 'done': False}
+        with open(self._manifest_path) as f:
+            manifest = json.load(f)
+        if manifest['job'] != job:
+            raise ValueError('%s holds a different harvest: %s' %(self.path, manifest['job']))
+        return manifest
+
+    def _write(self, name, write):
+        _write_atomic(os.path.join(self.path, name), write)
+
+    def _save_manifest(self):
+        self._write('manifest.json', lambda f: json.dump(self.manifest, f))
+
+    def _save_page(self, page, rows):
+        self._write('page_%08d.jsonl' %page,
+                    lambda f: f.writelines(json.dumps(row) + '\n' for row in rows))
+        self.manifest['pages'].append(page)
+        self.manifest['n_records'] += len(rows)
+        self._save_manifest()
+
+    def _load_page(self, page):
+        ''' data frame of one saved page, built like the pages of Scopus.search '''
+        record_class = Article if self.type_ == 1 or self.type_ == 'article' else Author
+        with open(os.path.join(self.path, 'page_%08d.jsonl' %page)) as f:
+            rows = [json.loads(line) for line in f]
+        columns = {key: [row.get(key) for row in rows] for key in record_class.columns}
+        return _columns_output(columns, record_class, 'frame')
+
+    @property
+    def done(self):
+        return self.manifest['done']
+
+    def run(self, workers=1):
+        '''
+            Request the pages not yet in the checkpoint directory.
+
+            Parameters
+            ----------
+            workers : int
+                Number of pages fetched concurrently (offset pagination only).
+
+            Returns
+            -------
+            pandas.DataFrame
+                All records of the harvest, see load.
+        '''
+        if not self.done:
+            if self.cursor:
+                self._run_cursor()
+            else:
+                self._run_offset(workers)
+        return self.load()
+
+    def _run_offset(self, workers):
+        scopus = self.scopus
+
+        def fetch_page(index):
+            return scopus._search_page(self.query, self.type_, self.view, index=index,
+                                       output='raw')[0]
+
+        if self.manifest['total_count'] is None:
+            rows, total_count, _ = scopus._search_page(self.query, self.type_, self.view,
+                                                       output='raw')
+            self.manifest['total_count'] = total_count
+            # pages are truncated as in Scopus.search, e.g. the error entry of empty results
+            self._save_page(0, rows[:min(self.count, total_count)])
+
+        count = min(self.count, self.manifest['total_count'])
+        completed = set(self.manifest['pages'])
+        indices = [index for index in range(25, count, 25) if index not in completed]
+        for index, rows in _iter_pages(fetch_page, indices, workers):
+            self._save_page(index, rows[:count-index])
+        self.manifest['done'] = True
+        self._save_manifest()
+
+    def _run_cursor(self):
+        scopus = self.scopus
+        count = self.count
+        while self.manifest['n_records'] < count:
+            next_cursor = self.manifest['next_cursor']
+            rows, total_count, current_cursor = scopus._search_page(self.query, 1, self.view,
+                                                                    cursor=next_cursor,
+                                                                    output='raw')
+            count = min(count, total_count)
+            rows = rows[:count-self.manifest['n_records']]
+            self.manifest['total_count'] = total_count
+            self.manifest['next_cursor'] = current_cursor
+            self._save_page(len(self.manifest['pages']), rows)
+            if len(rows) == 0 or current_cursor is None or current_cursor == next_cursor:
+                break
+        self.manifest['done'] = True
+        self._save_manifest()
+
+    def load(self):
+        '''
+            Returns
+            -------
+            pandas.DataFrame
+                Records of the completed pages, in search order.
+        '''
+        import pandas as pd
+        page_list = [self._load_page(page) for page in sorted(self.manifest['pages'])]
+        if len(page_list) == 0:
+            return pd.DataFrame()
+        return pd.concat(page_list, ignore_index=True)
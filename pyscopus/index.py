@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+'''
+    Local, queryable index of article search results
+'''
+
+import json, sqlite3, threading
+from pyscopus.records import Article
+from pyscopus.utils import _is_missing, _to_str
+
+class LocalIndex(object):
+    '''
+        SQLite index of article search results (see _parse_articles), with
+        inverted indexes on author id, ISSN/eISSN, affiliation name, DOI,
+        cover year and subtype, so common filters are answered offline.
+
+        Pages can be added as they arrive (e.g. from iter_search or
+        HarvestJob.load); an article added again replaces the previous copy,
+        so a re-run search refreshes citation counts.
+
+        Parameters
+        ----------
+        path : str
+            SQLite database file. ':memory:' (default) keeps the index in memory.
+    '''
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS articles
+                (scopus_id TEXT PRIMARY KEY, issn TEXT, eissn TEXT, doi TEXT,
+                 cover_year INTEGER, subtype_description TEXT, record TEXT);
+            CREATE TABLE IF NOT EXISTS article_authors (author_id TEXT, scopus_id TEXT);
+            CREATE TABLE IF NOT EXISTS article_affiliations (affiliation TEXT, scopus_id TEXT);
+            CREATE INDEX IF NOT EXISTS articles_issn ON articles (issn);
+            CREATE INDEX IF NOT EXISTS articles_eissn ON articles (eissn);
+            CREATE INDEX IF NOT EXISTS articles_doi ON articles (doi COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS articles_year ON articles (cover_year);
+            CREATE INDEX IF NOT EXISTS articles_subtype ON articles (subtype_description);
+            CREATE INDEX IF NOT EXISTS article_authors_author ON article_authors (author_id);
+            CREATE INDEX IF NOT EXISTS article_authors_article ON article_authors (scopus_id);
+            CREATE INDEX IF NOT EXISTS article_affiliations_name
+                ON article_affiliations (affiliation COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS article_affiliations_article
+                ON article_affiliations (scopus_id);
+        ''')
+        self._conn.commit()
+
+    @staticmethod
+    def _rows(results):
+        # data frame, Article records or dicts (output='frame'/'records'/'raw')
+        if hasattr(results, 'to_dict') and not isinstance(results, list):
+            return results.to_dict('records')
+        return [row if isinstance(row, dict) else row.to_dict() for row in results]
+
+    def add(self, results):
+        '''
+            Add (or replace) the articles of one page or more of search results.
+
+            Parameters
+            ----------
+            results : pandas.DataFrame, list of Article or list of dict
+                Article search results, as returned by search/iter_search.
+
+            Returns
+            -------
+            int
+                Number of articles added.
+        '''
+        rows = self._rows(results)
+        with self._lock:
+            for row in rows:
+                scopus_id = row.get('scopus_id')
+                if scopus_id is None:
+                    raise ValueError('Only article search results can be indexed')
+                scopus_id = str(scopus_id)
+                self._conn.execute('DELETE FROM article_authors WHERE scopus_id = ?', (scopus_id,))
+                self._conn.execute('DELETE FROM article_affiliations WHERE scopus_id = ?', (scopus_id,))
+                self._conn.execute('INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   (scopus_id, _issn(row.get('issn')), _issn(row.get('eissn')),
+                                    _to_str(row.get('doi')), _year(row.get('cover_date')),
+                                    _to_str(row.get('subtype_description')),
+                                    json.dumps({column: _json_value(row.get(column))
+                                                for column in Article.columns}, default=str)))
+                authors = row.get('authors')
+                if isinstance(authors, list):
+                    self._conn.executemany('INSERT INTO article_authors VALUES (?, ?)',
+                                           [(str(author_id), scopus_id) for author_id in authors])
+                affiliation = row.get('affiliation')
+                if isinstance(affiliation, list):
+                    names = set(affil.get('name') for affil in affiliation if isinstance(affil, dict))
+                    self._conn.executemany('INSERT INTO article_affiliations VALUES (?, ?)',
+                                           [(name, scopus_id) for name in names if name is not None])
+            self._conn.commit()
+        return len(rows)
+
+    def set_citation_counts(self, counts):
+        '''
+            Update the citation count of indexed articles.
+
+            Parameters
+            ----------
+            counts : dict
+                {scopus id: citation count}. Ids not in the index are ignored.
+
+            Returns
+            -------
+            int
+                Number of articles whose count changed.
+        '''
+        n_changed = 0
+        with self._lock:
+            for scopus_id, count in counts.items():
+                row = self._conn.execute('SELECT record FROM articles WHERE scopus_id = ?',
+                                         (str(scopus_id),)).fetchone()
+                if row is None:
+                    continue
+                record = json.loads(row[0])
+                if record['citation_count'] == count:
+                    continue
+                record['citation_count'] = count
+                self._conn.execute('UPDATE articles SET record = ? WHERE scopus_id = ?',
+                                   (json.dumps(record, default=str), str(scopus_id)))
+                n_changed += 1
+            self._conn.commit()
+        return n_changed
+
+    def _where(self, author_id=None, issn=None, affiliation=None, doi=None, year=None,
+               since=None, until=None, subtype=None):
+        clauses, args = list(), list()
+        if author_id is not None:
+            clauses.append('scopus_id IN (SELECT scopus_id FROM article_authors WHERE author_id = ?)')
+            args.append(str(author_id))
+        if issn is not None:
+            clauses.append('(issn = ? OR eissn = ?)')
+            args.extend([_issn(issn)]*2)
+        if affiliation is not None:
+            clauses.append('scopus_id IN (SELECT scopus_id FROM article_affiliations '
+                           'WHERE affiliation = ? COLLATE NOCASE)')
+            args.append(affiliation)
+        if doi is not None:
+            clauses.append('doi = ? COLLATE NOCASE')
+            args.append(doi)
+        if year is not None:
+            clauses.append('cover_year = ?')
+            args.append(int(year))
+        if since is not None:
+            clauses.append('cover_year >= ?')
+            args.append(int(since))
+        if until is not None:
+            clauses.append('cover_year <= ?')
+            args.append(int(until))
+        if subtype is not None:
+            clauses.append('subtype_description = ?')
+            args.append(subtype)
+        if len(clauses) == 0:
+            return '', args
+        return ' WHERE ' + ' AND '.join(clauses), args
+
+    def query(self, output='frame', **filters):
+        '''
+            Articles matching all the given filters.
+
+            Parameters
+            ----------
+            author_id : str
+                Scopus author id.
+            issn : str
+                Matched against both ISSN and eISSN, with or without dash.
+            affiliation : str
+                Affiliation name, case insensitive.
+            doi : str
+                Case insensitive.
+            year, since, until : int
+                Cover year, exactly or as an inclusive range.
+            subtype : str
+                Subtype description, e.g. 'Article', 'Review'.
+            output : str
+                'frame' (default), 'records' or 'raw', as in pyscopus.Scopus.
+
+            Returns
+            -------
+            pandas.DataFrame
+                Same columns as search results, sorted by cover year.
+        '''
+        where, args = self._where(**filters)
+        with self._lock:
+            rows = self._conn.execute('SELECT record FROM articles%s ORDER BY cover_year, scopus_id'
+                                      %where, args).fetchall()
+        rows = [json.loads(row[0]) for row in rows]
+        if output == 'records':
+            return [Article.from_dict(row) for row in rows]
+        if output == 'raw':
+            return rows
+        import pandas as pd
+        return pd.DataFrame(rows, columns=Article.columns)
+
+    def ids(self, **filters):
+        ''' Scopus ids of the articles matching filters (see query) '''
+        where, args = self._where(**filters)
+        with self._lock:
+            rows = self._conn.execute('SELECT scopus_id FROM articles%s ORDER BY cover_year, scopus_id'
+                                      %where, args).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, **filters):
+        ''' Number of articles matching filters (see query) '''
+        where, args = self._where(**filters)
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM articles%s' %where, args).fetchone()[0]
+
+    def coauthors(self, author_id, **filters):
+        '''
+            Co-authors of author_id among the articles matching filters (see query)
+
+            Returns
+            -------
+            dict
+                {author id: number of articles in common}, most frequent first.
+        '''
+        where, args = self._where(author_id=author_id, **filters)
+        with self._lock:
+            rows = self._conn.execute('SELECT author_id, COUNT(*) AS n FROM article_authors '
+                                      'WHERE scopus_id IN (SELECT scopus_id FROM articles%s) '
+                                      'AND author_id != ? GROUP BY author_id ORDER BY n DESC, author_id'
+                                      %where, args + [str(author_id)]).fetchall()
+        return dict(rows)
+
+    def __len__(self):
+        return self.count()
+
+    def close(self):
+        self._conn.close()
+
+def _json_value(value):
+    # stored as null like missing values of dicts, so NaN never differs from None
+    if _is_missing(value):
+        return None
+    return value
+
+def _issn(value):
+    value = _to_str(value)
+    if value is None:
+        return None
+    return value.replace('-', '').upper()
+
+def _year(cover_date):
+    try:
+        return int(str(cover_date)[:4])
+    except:
+        return None
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+'''
+    Per-endpoint instrumentation for Scopus objects
+'''
+
+import bisect, threading
+from collections import defaultdict
+from pyscopus import APIURI
+
+# upper bounds of histogram buckets, in seconds for timings, bytes for sizes
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+HELP = {'request_seconds': ('histogram', 'HTTP request latency'),
+        'response_bytes': ('histogram', 'Response payload size'),
+        'decode_seconds': ('histogram', 'JSON decoding time'),
+        'parse_seconds': ('histogram', 'Parsing time of decoded responses'),
+        'requests_total': ('counter', 'HTTP requests sent'),
+        'errors_total': ('counter', 'Responses with a non-200 status'),
+        'retries_total': ('counter', 'Requests retried after throttling'),
+        'cache_hits_total': ('counter', 'Responses served by the cache'),
+        'cache_misses_total': ('counter', 'Responses not found in the cache'),
+        'ratelimit_remaining': ('gauge', 'Last X-RateLimit-Remaining seen')}
+
+def endpoint_of(url):
+    '''
+        Lower-cased name of the APIURI constant url belongs to, e.g. 'search', or 'other'
+    '''
+    url = url.split('://', 1)[-1]
+    best, best_len = 'other', 0
+    for name, base in vars(APIURI).items():
+        if name.startswith('_') or not isinstance(base, str):
+            continue
+        base = base.split('://', 1)[-1]
+        if url.startswith(base) and len(base) > best_len:
+            best, best_len = name, len(base)
+    return best.lower()
+
+class Metrics(object):
+    '''
+        Thread-safe registry of counters, gauges and histograms per endpoint.
+
+        Pass one to Scopus(metrics=...) to record request latency, payload
+        size, decode and parse time, retries, rate limit headroom and cache
+        hits. Without one nothing is measured.
+
+        Listeners added with add_listener are called as
+        listener(name, endpoint, value) for every observation.
+    '''
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.gauges = dict()
+        self.histograms = dict()
+        self.listeners = list()
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, name, endpoint, value):
+        for listener in self.listeners:
+            listener(name, endpoint, value)
+
+    def inc(self, name, endpoint, value=1):
+        with self._lock:
+            self.counters[(name, endpoint)] += value
+        self._notify(name, endpoint, value)
+
+    def set(self, name, endpoint, value):
+        with self._lock:
+            self.gauges[(name, endpoint)] = value
+        self._notify(name, endpoint, value)
+
+    def observe(self, name, endpoint, value):
+        buckets = SIZE_BUCKETS if name.endswith('bytes') else TIME_BUCKETS
+        with self._lock:
+            hist = self.histograms.get((name, endpoint))
+            if hist is None:
+                # bucket counts (last one is +Inf), sum
+                hist = self.histograms[(name, endpoint)] = [[0]*(len(buckets)+1), 0.0]
+            hist[0][bisect.bisect_left(buckets, value)] += 1
+            hist[1] += value
+        self._notify(name, endpoint, value)
+
+    def summary(self):
+        '''
+            Returns
+            -------
+            dict
+                {endpoint: {metric: value}}, with count and mean for histograms
+                and the cache hit rate when the cache was used.
+        '''
+        summary = defaultdict(dict)
+        with self._lock:
+            for (name, endpoint), value in self.counters.items():
+                summary[endpoint][name] = value
+            for (name, endpoint), value in self.gauges.items():
+                summary[endpoint][name] = value
+            for (name, endpoint), (counts, total) in self.histograms.items():
+                summary[endpoint][name] = {'count': sum(counts), 'mean': total/sum(counts)}
+        for d in summary.values():
+            hits, misses = d.get('cache_hits_total', 0), d.get('cache_misses_total', 0)
+            if hits + misses > 0:
+                d['cache_hit_rate'] = float(hits)/(hits+misses)
+        return dict(summary)
+
+    def to_prometheus(self, prefix='pyscopus_'):
+        '''
+            Returns
+            -------
+            str
+                All metrics in the Prometheus text exposition format.
+        '''
+        series = defaultdict(list)
+        with self._lock:
+            for (name, endpoint), value in sorted(self.counters.items()):
+                series[name].append('%s%s{endpoint="%s"} %s' %(prefix, name, endpoint, value))
+            for (name, endpoint), value in sorted(self.gauges.items()):
+                series[name].append('%s%s{endpoint="%s"} %s' %(prefix, name, endpoint, value))
+            for (name, endpoint), (counts, total) in sorted(self.histograms.items()):
+                buckets = SIZE_BUCKETS if name.endswith('bytes') else TIME_BUCKETS
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    series[name].append('%s%s_bucket{endpoint="%s",le="%s"} %s'
+                                        %(prefix, name, endpoint, bound, cumulative))
+                series[name].append('%s%s_sum{endpoint="%s"} %s' %(prefix, name, endpoint, total))
+                series[name].append('%s%s_count{endpoint="%s"} %s' %(prefix, name, endpoint, cumulative))
+        lines = list()
+        for name in sorted(series):
+            kind, text = HELP.get(name, ('untyped', name))
+            lines.append('# HELP %s%s %s' %(prefix, name, text))
+            lines.append('# TYPE %s%s %s' %(prefix, name, kind))
+            lines.extend(series[name])
+        return '\n'.join(lines) + '\n'
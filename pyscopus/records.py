@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+'''
+    Compact typed records, an alternative to one pd.Series/dict per entity.
+    Used when a Scopus object is created with output='records'.
+'''
+
+class Record(object):
+    '''
+        Base class of the records: a fixed set of attributes stored in
+        __slots__ (no per-instance __dict__), in the order of `columns`,
+        the column names of the matching data frame.
+    '''
+    __slots__ = ()
+    columns = ()
+
+    def __init__(self, *args, **kwargs):
+        for slot, value in zip(self.__slots__, args):
+            setattr(self, slot, value)
+        for slot in self.__slots__[len(args):]:
+            setattr(self, slot, kwargs.get(slot))
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(*[d.get(column) for column in cls.columns])
+
+    def to_dict(self):
+        return {column: getattr(self, slot) for slot, column in zip(self.__slots__, self.columns)}
+
+    @classmethod
+    def _to_frame(cls, records):
+        import pandas as pd
+        return pd.DataFrame({column: [getattr(record, slot) for record in records]
+                             for slot, column in zip(cls.__slots__, cls.columns)},
+                            columns=cls.columns)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and \
+                all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' %(type(self).__name__,
+                          ', '.join('%s=%r' %(slot, getattr(self, slot)) for slot in self.__slots__))
+
+def to_frame(records):
+    '''
+        Build one data frame, column by column, from a list of records of the same type
+    '''
+    records = list(records)
+    if len(records) == 0:
+        import pandas as pd
+        return pd.DataFrame()
+    return type(records[0])._to_frame(records)
+
+class Article(Record):
+    ''' document from search, see _parse_articles '''
+    __slots__ = ('scopus_id', 'title', 'publication_name', 'issn', 'isbn', 'eissn', 'volume',
+                 'page_range', 'cover_date', 'doi', 'citation_count', 'affiliation',
+                 'aggregation_type', 'subtype_description', 'authors', 'full_text')
+    columns = __slots__
+
+class Author(Record):
+    ''' author from author search, see _parse_authors '''
+    __slots__ = ('author_id', 'name', 'document_count', 'affiliation', 'affiliation_id')
+    columns = __slots__
+
+class AuthorProfile(Record):
+    ''' author from author retrieval, see _parse_author_retrieval '''
+    __slots__ = ('author_id', 'eid', 'document_count', 'cited_by_count', 'citation_count',
+                 'name', 'last', 'first', 'indexed_name', 'publication_range')
+    columns = ('author-id', 'eid', 'document-count', 'cited-by-count', 'citation-count',
+               'name', 'last', 'first', 'indexed-name', 'publication-range')
+
+class Affiliation(Record):
+    ''' affiliation from affiliation retrieval, see _parse_aff '''
+    __slots__ = ('aff_id', 'eid', 'affiliation_name', 'address', 'city', 'country',
+                 'org_type', 'org_domain', 'org_url', 'date_created')
+    columns = ('aff_id', 'eid', 'affiliation-name', 'address', 'city', 'country',
+               'org-type', 'org-domain', 'org-URL', 'date-created')
+
+class Abstract(Record):
+    ''' main coredata fields of an abstract retrieval, see _parse_abstract_retrieval '''
+    __slots__ = ('scopus_id', 'eid', 'doi', 'pubmed_id', 'title', 'abstract', 'publication_name',
+                 'issn', 'volume', 'page_range', 'cover_date', 'citedby_count',
+                 'aggregation_type', 'subtype_description')
+    columns = ('scopus-id', 'eid', 'prism:doi', 'pubmed-id', 'title', 'abstract',
+               'prism:publicationName', 'prism:issn', 'prism:volume', 'prism:pageRange',
+               'prism:coverDate', 'citedby-count', 'prism:aggregationType', 'subtypeDescription')
+
+class CitationRow(Record):
+    ''' citation counts of one document, see _parse_citation '''
+    __slots__ = ('scopus_id', 'previous_citation', 'start_year', 'counts',
+                 'later_citation', 'total_citation')
+    columns = __slots__
+
+    def to_dict(self):
+        d = {'scopus_id': self.scopus_id, 'previous_citation': self.previous_citation}
+        for i, count in enumerate(self.counts):
+            d[str(self.start_year+i)] = count
+        d['later_citation'] = self.later_citation
+        d['total_citation'] = self.total_citation
+        return d
+
+    @classmethod
+    def _to_frame(cls, records):
+        import pandas as pd
+        return pd.DataFrame([record.to_dict() for record in records])
@@ -1,14 +1,57 @@
 # -*- coding: utf-8 -*-
 
-import requests, warnings, os, json
-import numpy as np
-import pandas as pd
-from datetime import date
+import warnings, os, json, functools, time
 from pyscopus import APIURI
-from pyscopus.utils import _parse_author, _parse_author_retrieval,\
-        _parse_affiliation, _parse_entry, _parse_citation,\
-        _parse_abstract_retrieval, trunc,\
-        _search_scopus, _parse_serial, _parse_aff
+from pyscopus.transport import Transport, KeyPool, ScopusHTTPError
+from pyscopus.cache import SingleFlight, MemoryCache
+from pyscopus.metrics import endpoint_of
+from pyscopus.decoding import decode_response, search_page_decoder
+from pyscopus.harvest import HarvestJob
+from pyscopus.sinks import FileSink, article_schema, author_schema, citation_schema
+from pyscopus.records import AuthorProfile, Abstract, Affiliation
+from pyscopus.utils import _parse_author_retrieval, _parse_author_retrieval_list,\
+        _parse_citation, _parse_abstract_retrieval,\
+        _parse_serial, _parse_aff, _iter_pages,\
+        _search_request, _check_cursor, _warn_missing_citations, _parse_search_page, _parse_search_page_struct, _parse_citation_panel
+
+def _coalesced(method):
+    '''
+        Concurrent calls of method with the same arguments share one request
+        and its parsed result when the Scopus object coalesces requests.
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.single_flight is None:
+            return method(self, *args, **kwargs)
+        try:
+            key = MemoryCache.make_key(method, args, kwargs, self.output)
+            hash(key)
+        except TypeError:
+            # unhashable or invalid arguments: not shared
+            return method(self, *args, **kwargs)
+        return self.single_flight.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+def _memoized(method):
+    '''
+        Results of method are kept in the MemoryCache of the Scopus object,
+        if any, and returned again for the same arguments and output.
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.memo is None:
+            return method(self, *args, **kwargs)
+        try:
+            key = MemoryCache.make_key(method, args, kwargs, self.output)
+            found, result = self.memo.get(key)
+        except TypeError:
+            # unhashable or invalid arguments
+            return method(self, *args, **kwargs)
+        if not found:
+            result = method(self, *args, **kwargs)
+            self.memo.set(key, result)
+        return result
+    return wrapper
 
 class Scopus(object):
     '''
@@ -22,13 +65,171 @@ class Scopus(object):
         zhiyazuo@gmail.com
     '''
 
-    def __init__(self, apikey=None):
+    def __init__(self, apikey=None, transport=None, cache=None, output='frame', coalesce=False,
+                 metrics=None, memo=None, **transport_kwargs):
+        '''
+            Parameters
+            ----------------------------------------------------------------------
+            apikey : str, list of str or pyscopus.transport.KeyPool
+                Elsevier api key. Get it here: https://dev.elsevier.com/index.html
+                With several keys, requests are spread over them by the default
+                transport, following the quota of each key (see KeyPool).
+            transport : object
+                Object with a `get(url, params=None)` method used for every request.
+                Defaults to a pooled, keep-alive pyscopus.transport.Transport.
+            transport_kwargs :
+                Passed to pyscopus.transport.Transport when transport is None
+                (pool_connections, pool_maxsize, timeout, keep_alive, headers,
+                rate_limit, max_retries, backoff).
+            cache : pyscopus.cache.ResponseCache
+                Optional persistent cache for author, abstract, serial and
+                affiliation responses. Default is None (no caching).
+            output : str
+                'frame' (default) returns pandas objects as documented in each
+                method. 'records' returns compact pyscopus.records objects
+                instead (lists of them in place of data frames) for search,
+                author, abstract, citation and affiliation results; convert
+                with pyscopus.records.to_frame. 'raw' returns plain dicts and
+                lists of dicts instead, so pandas is never imported.
+            coalesce : bool
+                If True, concurrent calls of retrieve_author, retrieve_abstract,
+                search_serial, retrieve_serial and retrieve_affiliation with the
+                same arguments share one request and get the same result object.
+            metrics : pyscopus.metrics.Metrics
+                Records per-endpoint request latency, payload size, decode and
+                parse time, errors and cache hits (plus retries and rate limit
+                headroom with the default transport). Default is None.
+            memo : pyscopus.cache.MemoryCache
+                In-memory cache of the parsed results of retrieve_author,
+                search_serial, retrieve_serial and retrieve_affiliation, used
+                before the response cache. Default is None.
+        '''
+        if output not in ('frame', 'records', 'raw'):
+            raise ValueError('%s is not a valid output, use frame, records or raw' %output)
+        self.key_pool = None
+        if isinstance(apikey, (list, tuple)):
+            apikey = KeyPool(apikey)
+        if isinstance(apikey, KeyPool):
+            if transport is not None:
+                raise ValueError('Several api keys need the default transport')
+            self.key_pool = transport_kwargs['key_pool'] = apikey
+            # placeholder, replaced by the key selected for each request
+            apikey = apikey.keys[0] if len(apikey.keys) > 0 else None
         self.apikey = apikey
+        if transport is None:
+            transport = Transport(metrics=metrics, **transport_kwargs)
+        self.transport = transport
+        self.cache = cache
+        self.output = output
+        self.single_flight = SingleFlight() if coalesce else None
+        self.metrics = metrics
+        self.memo = memo
 
     def add_key(self, apikey):
-        self.apikey = apikey
+        if self.key_pool is not None:
+            self.key_pool.add(apikey)
+        else:
+            self.apikey = apikey
 
-    def search(self, query, count=100, type_=1, view='COMPLETE'):
+    def key_usage(self):
+        '''
+            Returns
+            -------
+            dict
+                Requests, throttled responses and last reported quota per key
+                (see KeyPool.usage). Empty without a pool of keys.
+        '''
+        if self.key_pool is None:
+            return dict()
+        return self.key_pool.usage()
+
+    def _get_json(self, endpoint, url, params):
+        '''
+            Same as _fetch_json, going through the cache if any
+        '''
+        if self.cache is not None:
+            js = self.cache.get(endpoint, url, params)
+            if self.metrics is not None:
+                self.metrics.inc('cache_misses_total' if js is None else 'cache_hits_total',
+                                 endpoint_of(url))
+            if js is not None:
+                return js
+        js = self._fetch_json(url, params)
+        if self.cache is not None:
+            self.cache.set(endpoint, url, params, js)
+        return js
+
+    def _fetch_json(self, url, params, decoder=None):
+        '''
+            GET url and decode the JSON response, see decoding.decode_response.
+            Raises ScopusHTTPError (a ValueError) for non-200 responses.
+        '''
+        if self.metrics is None:
+            r = self.transport.get(url, params=params)
+            if r.status_code != 200:
+                raise ScopusHTTPError(r.status_code, url)
+            return decode_response(r, decoder)
+
+        endpoint = endpoint_of(url)
+        start = time.time()
+        r = self.transport.get(url, params=params)
+        self.metrics.observe('request_seconds', endpoint, time.time() - start)
+        self.metrics.inc('requests_total', endpoint)
+        if r.status_code != 200:
+            self.metrics.inc('errors_total', endpoint)
+            raise ScopusHTTPError(r.status_code, url)
+        content = getattr(r, 'content', None)
+        if content is not None:
+            self.metrics.observe('response_bytes', endpoint, len(content))
+        start = time.time()
+        js = decode_response(r, decoder)
+        self.metrics.observe('decode_seconds', endpoint, time.time() - start)
+        return js
+
+    def _parse(self, url, parser, *args):
+        '''
+            parser(*args), timed as the parse time of url's endpoint
+        '''
+        if self.metrics is None:
+            return parser(*args)
+        start = time.time()
+        try:
+            return parser(*args)
+        finally:
+            self.metrics.observe('parse_seconds', endpoint_of(url), time.time() - start)
+
+    def _search_page(self, query, type_, view, index=0, cursor=None, output=None, fields=None,
+                     count=None):
+        '''
+            One page of search results, total count and next cursor.
+            output defaults to the output of this object.
+        '''
+        url, par = _search_request(self.apikey, query, type_, view, index, cursor, fields, count)
+        if output is None:
+            output = self.output
+        if type_ == 1 or type_ == 'article':
+            js = self._fetch_json(url, par, decoder=search_page_decoder())
+            if not isinstance(js, dict):
+                return self._parse(url, _parse_search_page_struct, js, output)
+        else:
+            js = self._fetch_json(url, par)
+        return self._parse(url, _parse_search_page, js, type_, output)
+
+    def _collect(self, part_list):
+        ''' concatenate pages/chunks of results '''
+        if self.output == 'records' or self.output == 'raw':
+            return [record for part in part_list for record in part]
+        import pandas as pd
+        if len(part_list) == 0:
+            return pd.DataFrame()
+        return pd.concat(part_list, ignore_index=True)
+
+    def _record(self, d, record_class):
+        if self.output == 'records':
+            return record_class.from_dict(d)
+        return d
+
+    def search(self, query, count=100, type_=1, view='COMPLETE', workers=1, cursor=False):
         '''
             Search for documents matching the keywords in query
             Details: http://api.elsevier.com/documentation/SCOPUSSearchAPI.wadl
@@ -42,6 +243,15 @@ class Scopus(object):
                 The number of records to be returned.
             view : string
                 Returned result view (i.e., return fields). Can only be STANDARD for author search.
+            workers : int
+                Number of pages fetched concurrently once the first page has
+                revealed the total number of results. Default is 1 (sequential).
+                Keep it at or below the transport pool size.
+            cursor : bool
+                Page with the cursor returned by Scopus instead of start offsets.
+                Needed to go beyond 5000 results; pages are then fetched one
+                after another and workers is ignored. Article search only
+                (ValueError for other types).
 
             Returns
             ----------------------------------------------------------------------
@@ -49,28 +259,86 @@ class Scopus(object):
                Data frame of search results.
         '''
 
+        page_list = list(self.iter_search(query, count, type_=type_, view=view,
+                                          workers=workers, cursor=cursor))
+        return self._collect(page_list)
+
+    def iter_search(self, query, count=100, type_=1, view='COMPLETE', workers=1, cursor=False):
+        '''
+            Same as search, but yields the results one page at a time as soon
+            as each page arrives, so memory stays bounded regardless of count.
+
+            Parameters
+            ----------------------------------------------------------------------
+            See search. With workers > 1 at most that many pages are in flight.
+
+            Returns
+            ----------------------------------------------------------------------
+            generator of pandas.DataFrame
+               Data frames of up to 25 search results each, in order.
+        '''
 
         if type(count) is not int:
-            raise ValueError("%s is not a valid input for the number of entries to return." %number)
+            raise ValueError("%s is not a valid input for the number of entries to return." %count)
+        _check_cursor(type_, cursor)
+
+        # checked above when called, not when the first page is requested
+        if cursor:
+            return self._iter_search_cursor(query, count, view)
+        return self._iter_search_offset(query, count, type_, view, workers)
 
-        result_df, total_count = _search_scopus(self.apikey, query, type_, view=view)
+    def _iter_search_offset(self, query, count, type_, view, workers):
+        page_df, total_count, _ = self._search_page(query, type_, view)
 
         if total_count <= count:
             count = total_count
 
-        if count <= 25:
-            # if less than 25, just one page of response is enough
-            return result_df[:count]
+        # if less than 25, just one page of response is enough
+        yield page_df[:count]
+
+        # if larger than, the remaining start offsets are known from total_count
+        def fetch_page(index):
+            return self._search_page(query, type_, view, index=index)[0]
+
+        indices = range(25, count, 25)
+        for index, page_df in _iter_pages(fetch_page, indices, workers):
+            yield page_df[:count-index]
+
+    def _iter_search_cursor(self, query, count, view):
+        n_records = 0
+        next_cursor = '*'
+        while n_records < count:
+            page_df, total_count, current_cursor = self._search_page(query, 1, view,
+                                                                     cursor=next_cursor)
+            count = min(count, total_count)
+            page_df = page_df[:count-n_records]
+            n_records += len(page_df)
+            yield page_df
+            # stop when the cursor no longer moves or the page is empty
+            if len(page_df) == 0 or current_cursor is None or current_cursor == next_cursor:
+                break
+            next_cursor = current_cursor
+
+    def harvest(self, query, path, count=100, type_=1, view='COMPLETE', workers=1, cursor=False):
+        '''
+            Same as search, but every page is checkpointed under path, and
+            calling it again with the same arguments only requests the pages
+            still missing (see pyscopus.harvest.HarvestJob).
 
-        # if larger than, go to next few pages until enough
-        i = 1
-        while True:
-            index = 25*i
-            result_df = result_df.append(_search_scopus(self.apikey, query, type_, view=view, index=index),
-                                         ignore_index=True)
-            if result_df.shape[0] >= count:
-                return result_df[:count]
-            i += 1
+            Parameters
+            ----------------------------------------------------------------------
+            path : str
+                Checkpoint directory of this harvest.
+            Others: see search.
+
+            Returns
+            ----------------------------------------------------------------------
+            pandas.DataFrame
+               Data frame of search results.
+        '''
+
+        job = HarvestJob(self, path, query, count, type_=type_, view=view, cursor=cursor)
+        return job.run(workers=workers)
 
     def search_author(self, query, view='STANDARD', count=10):
         '''
@@ -95,7 +363,7 @@ class Scopus(object):
 
         return self.search(query, count, type_=2, view=view)
 
-    def search_author_publication(self, author_id, count=10000):
+    def search_author_publication(self, author_id, count=10000, cursor=False):
         '''
             Returns a list of document records for an author in the form of pandas.DataFrame.
 
@@ -108,6 +376,8 @@ class Scopus(object):
                 Author id in Scopus database.
             count : int
                 The number of records to return. By default set to 10000 for all docs.
+            cursor : bool
+                Use cursor based pagination (see search).
 
             Returns
             ----------------------------------------------------------------------
@@ -116,8 +386,10 @@ class Scopus(object):
         '''
 
         query = 'au-id(%s)'%author_id
-        return self.search(query, count)
+        return self.search(query, count, cursor=cursor)
 
+    @_memoized
+    @_coalesced
     def retrieve_author(self, author_id):
         '''
             Search for specific authors
@@ -135,14 +407,58 @@ class Scopus(object):
         '''
 
         par = {'apikey': self.apikey, 'httpAccept': 'application/json'}
-        r = requests.get('%s/%s'%(APIURI.AUTHOR, author_id), params=par)
-
-        js = r.json()
+        url = '%s/%s'%(APIURI.AUTHOR, author_id)
+        js = self._get_json('author', url, par)
         try:
-            return _parse_author_retrieval(js)
+            author_dict = self._parse(url, _parse_author_retrieval, js)
         except:
             raise ValueError('Author %s not found!' %author_id)
+        return self._record(author_dict, AuthorProfile)
+
+    def retrieve_authors(self, author_id_array, chunk_size=25, workers=1):
+        '''
+            Retrieve many authors, packing up to chunk_size ids in one request
+            Details: http://api.elsevier.com/documentation/AuthorRetrievalAPI.wadl
 
+            Parameters
+            ----------------------------------------------------------------------
+            author_id_array : array (list, tuple, np.array or pd.Series)
+                Author ids in Scopus database.
+            chunk_size : int
+                Number of ids per request. Default is 25, the API limit.
+            workers : int
+                Number of requests sent concurrently. Default is 1 (sequential).
+
+            Returns
+            ----------------------------------------------------------------------
+            pandas.DataFrame
+               One row of author information (see retrieve_author) per author found.
+        '''
+
+        author_id_list = [str(author_id) for author_id in author_id_array]
+
+        def fetch_chunk(index):
+            par = {'apikey': self.apikey, 'httpAccept': 'application/json',
+                   'author_id': ','.join(author_id_list[index:index+chunk_size])}
+            js = self._get_json('author', APIURI.AUTHOR_MULTI, par)
+            return self._parse(APIURI.AUTHOR_MULTI, _parse_author_retrieval_list, js)
+
+        indices = range(0, len(author_id_list), chunk_size)
+        author_list = list()
+        for _, author_dict_list in _iter_pages(fetch_chunk, indices, workers):
+            author_list.extend(author_dict for author_dict in author_dict_list if author_dict is not None)
+
+        if len(author_list) < len(author_id_list):
+            warnings.warn("%i of %i authors not found" %(len(author_id_list)-len(author_list),
+                                                          len(author_id_list)), UserWarning)
+        if self.output == 'records':
+            return [AuthorProfile.from_dict(author_dict) for author_dict in author_list]
+        if self.output == 'raw':
+            return author_list
+        import pandas as pd
+        return pd.DataFrame(author_list)
+
+    @_coalesced
     def retrieve_abstract(self, scopus_id, download_path=None, view='FULL'):
         '''
             Retrieve publication abstracts
@@ -165,57 +481,259 @@ class Scopus(object):
         '''
 
         par = {'apikey': self.apikey, 'httpAccept': 'application/json', 'view': view}
-        r = requests.get('%s/%s'%(APIURI.ABSTRACT, scopus_id), params=par)
-
-        js = r.json()
+        url = '%s/%s'%(APIURI.ABSTRACT, scopus_id)
+        js = self._get_json('abstract', url, par)
 
         if download_path is not None:
-            if not os.path.exists(download_path):
-                os.mkdir(download_path)
-            if not download_path.endswith('/'):
-                download_path += '/'
-            json.dump(js, open(download_path+scopus_id+'.json', 'w'))
+            # exist_ok: retrieve_abstracts workers may create it at the same time
+            os.makedirs(download_path, exist_ok=True)
+            with open(os.path.join(download_path, scopus_id+'.json'), 'w') as f:
+                json.dump(js, f)
 
         try:
-            return _parse_abstract_retrieval(js)
+            abstract_dict = self._parse(url, _parse_abstract_retrieval, js)
         except:
             raise ValueError('Abstract for %s not found!' %scopus_id)
+        return self._record(abstract_dict, Abstract)
 
-    def retrieve_citation(self, scopus_id_array, year_range):
+    def retrieve_abstracts(self, scopus_id_array, download_path=None, view='FULL', workers=1):
+        '''
+            Retrieve abstracts for many publications, see retrieve_abstract.
+            Failures are collected instead of raised, so the ids can be retried.
+
+            Parameters
+            ----------------------------------------------------------------------
+            scopus_id_array : array (list, tuple, np.array or pd.Series)
+                Scopus ids of publications in Scopus database.
+            download_path : str
+                Where to save JSON responses. Default is None (do not save)
+            view : str
+                Options: BASIC, META, META_ABS, REF, FULL (default)
+            workers : int
+                Number of abstracts fetched concurrently. Default is 1 (sequential).
+
+            Returns
+            ----------------------------------------------------------------------
+            2 pandas DataFrames:
+                - first one has one row per retrieved abstract
+                - second one has the failed ids, with columns scopus_id, status
+                  (HTTP status code, None if the request did not get a response
+                  or the response could not be parsed) and error
+            With output='raw', a list of dicts each instead.
+        '''
+
+        scopus_id_list = [str(scopus_id) for scopus_id in scopus_id_array]
+
+        def fetch_abstract(index):
+            scopus_id = scopus_id_list[index]
+            try:
+                return self.retrieve_abstract(scopus_id, download_path, view), None
+            except Exception as e:
+                return None, {'scopus_id': scopus_id, 'status': getattr(e, 'status_code', None),
+                              'error': str(e)}
+
+        abstract_list, failed_list = list(), list()
+        for _, (abstract_dict, failed_dict) in _iter_pages(fetch_abstract, range(len(scopus_id_list)), workers):
+            if failed_dict is None:
+                abstract_list.append(abstract_dict)
+            else:
+                failed_list.append(failed_dict)
+
+        if self.output == 'raw':
+            return abstract_list, failed_list
+        import pandas as pd
+        failed_df = pd.DataFrame(failed_list, columns=['scopus_id', 'status', 'error'])
+        failed_df['status'] = failed_df['status'].astype('Int64')
+        if self.output == 'records':
+            return abstract_list, failed_df
+        return pd.DataFrame(abstract_list), failed_df
+
+    def retrieve_citation(self, scopus_id_array, year_range, chunk_size=25, workers=1):
         '''
             Retrieve citation counts
             Details: https://api.elsevier.com/documentation/AbstractCitationAPI.wadl
 
             Parameters
             ----------------------------------------------------------------------
-            scopus_id_array : array (list, tuple or np.array)
-                Scopus id of a publication in Scopus database.
+            scopus_id_array : array (list, tuple, np.array or pd.Series)
+                Scopus id of a publication in Scopus database. Any number of ids;
+                they are sent chunk_size at a time.
 
             year_range : array (list, tuple or np.array) of length 2
                 1st element is the start year; 2nd element is the end year. Both integers.
 
+            chunk_size : int
+                Number of ids per request. Default is 25, the API limit.
+
+            workers : int
+                Number of chunks fetched concurrently. Default is 1 (sequential).
+
+            Returns
+            ----------------------------------------------------------------------
+            pandas DataFrame
+               Data frame of citation counts over time. Ids without counts
+               are left out, with a warning.
+        '''
+
+        citation_df_list = list(self.iter_citation(scopus_id_array, year_range,
+                                                   chunk_size=chunk_size, workers=workers))
+        return self._collect(citation_df_list)
+
+    def iter_citation(self, scopus_id_array, year_range, chunk_size=25, workers=1):
+        '''
+            Same as retrieve_citation, but yields the citation counts one
+            chunk at a time, in order, as each chunk arrives.
+
+            Returns
+            ----------------------------------------------------------------------
+            generator of pandas DataFrame
+               Ids without citation counts are left out, with a warning at
+               the end.
+        '''
+
+        scopus_id_list = [str(scopus_id) for scopus_id in scopus_id_array]
+
+        def fetch_chunk(index):
+            js = self._citation_json(scopus_id_list[index:index+chunk_size], year_range)
+            return self._parse(APIURI.CITATION, _parse_citation, js, year_range, self.output)
+
+        n_found = 0
+        indices = range(0, len(scopus_id_list), chunk_size)
+        for _, citation_df in _iter_pages(fetch_chunk, indices, workers):
+            n_found += len(citation_df)
+            yield citation_df
+        _warn_missing_citations(n_found, len(scopus_id_list))
+
+    def _citation_json(self, scopus_id_list, year_range):
+        par = {'apikey': self.apikey, 'scopus_id': ','.join(scopus_id_list), \
+                'httpAccept':'application/json', 'date': '%i-%i' %(year_range[0], year_range[1])}
+        return self._fetch_json(APIURI.CITATION, par)
+
+    def retrieve_citation_panel(self, scopus_id_array, year_range, chunk_size=25, workers=1):
+        '''
+            Same as retrieve_citation, but the counts are parsed straight into
+            one preallocated integer array instead of a dict per paper.
+            See pyscopus.citations for h-index, per-year sums and cumulative
+            counts on the result.
+
+            Parameters
+            ----------------------------------------------------------------------
+            See retrieve_citation.
+
             Returns
             ----------------------------------------------------------------------
             pandas DataFrame
-               Data frame of citation counts over time.
+               int64 counts indexed by scopus_id, with columns previous_citation,
+               one per year (as str, like retrieve_citation), later_citation
+               and total_citation. Missing counts are 0.
+        '''
+        import numpy as np
+        import pandas as pd
+
+        scopus_id_list = [str(scopus_id) for scopus_id in scopus_id_array]
+        years = [str(yr) for yr in range(year_range[0], year_range[1]+1)]
+        panel = np.zeros((len(scopus_id_list), len(years)+3), dtype=np.int64)
+        # chunks write disjoint row ranges of panel, possibly from several threads
+        def fetch_chunk(index):
+            js = self._citation_json(scopus_id_list[index:index+chunk_size], year_range)
+            return self._parse(APIURI.CITATION, _parse_citation_panel, js, year_range,
+                               panel[index:index+chunk_size])
+
+        rows = np.zeros(len(scopus_id_list), dtype=bool)
+        index_list = list()
+        indices = range(0, len(scopus_id_list), chunk_size)
+        for index, chunk_id_list in _iter_pages(fetch_chunk, indices, workers):
+            rows[index:index+len(chunk_id_list)] = True
+            index_list.extend(chunk_id_list)
+
+        _warn_missing_citations(len(index_list), len(scopus_id_list))
+        if not rows.all():
+            panel = panel[rows]
+        return pd.DataFrame(panel, index=pd.Index(index_list, name='scopus_id'),
+                            columns=['previous_citation'] + years + ['later_citation', 'total_citation'])
+
+    def search_to_file(self, query, path, count=100, type_=1, view='COMPLETE', workers=1,
+                       cursor=False, format='parquet'):
         '''
+            Stream search results to a Parquet or Arrow IPC file, one row group
+            per page, with a typed schema (see pyscopus.sinks). Requires pyarrow.
+
+            Parameters
+            ----------------------------------------------------------------------
+            path : str
+                Output file.
+            format : str
+                'parquet' (default) or 'arrow'.
+            Others: see search.
 
-        date = '%i-%i' %(year_range[0], year_range[1])
+            Returns
+            ----------------------------------------------------------------------
+            int
+               Number of records written.
+        '''
 
-        par = {'apikey': self.apikey, 'scopus_id': ','.join(scopus_id_array), \
-                'httpAccept':'application/json', 'date': date}
+        schema = article_schema() if type_ == 1 or type_ == 'article' else author_schema()
+        with FileSink(path, schema, format=format) as sink:
+            for page_df in self.iter_search(query, count, type_=type_, view=view,
+                                            workers=workers, cursor=cursor):
+                sink.write(page_df)
+        return sink.n_records
 
-        r = requests.get(APIURI.CITATION, params=par)
-        js = r.json()
+    def citation_to_file(self, scopus_id_array, year_range, path, chunk_size=25, workers=1,
+                         format='parquet'):
+        '''
+            Stream citation counts to a Parquet or Arrow IPC file, one row group
+            per chunk, with integer counts (see pyscopus.sinks). Requires pyarrow.
 
-        return _parse_citation(js, year_range)
+            Parameters
+            ----------------------------------------------------------------------
+            path : str
+                Output file.
+            format : str
+                'parquet' (default) or 'arrow'.
+            Others: see retrieve_citation.
+
+            Returns
+            ----------------------------------------------------------------------
+            int
+               Number of records written.
+        '''
+
+        with FileSink(path, citation_schema(year_range), format=format) as sink:
+            for citation_df in self.iter_citation(scopus_id_array, year_range,
+                                                  chunk_size=chunk_size, workers=workers):
+                sink.write(citation_df)
+        return sink.n_records
+
+    def search_to_index(self, query, index, count=100, view='COMPLETE', workers=1, cursor=False):
+        '''
+            Add article search results to a local index page by page, so
+            later filters are answered offline (see pyscopus.index.LocalIndex).
+
+            Parameters
+            ----------------------------------------------------------------------
+            index : pyscopus.index.LocalIndex
+                Index to update. Articles already in it are replaced.
+            Others: see search.
+
+            Returns
+            ----------------------------------------------------------------------
+            int
+               Number of articles added.
+        '''
+
+        n_records = 0
+        for page_df in self.iter_search(query, count, view=view, workers=workers, cursor=cursor):
+            n_records += index.add(page_df)
+        return n_records
 
     def retrieve_full_text(self, full_text_link):
-        r = requests.get(full_text_link, params={'apikey': self.apikey,
-                                                 'httpAccept': 'application/json'}
-                        )
-        return r.json()['full-text-retrieval-response']['originalText']
+        js = self._fetch_json(full_text_link, {'apikey': self.apikey,
+                                               'httpAccept': 'application/json'})
+        return js['full-text-retrieval-response']['originalText']
 
+    @_memoized
+    @_coalesced
     def search_serial(self, title, view='CITESCORE', count=200):
         '''
             Search serial title metadata
@@ -237,6 +755,7 @@ class Scopus(object):
                 - second one is the temporal citescore in each year
                 - last one is the temporal rank/percentile for each subject code in each year
             If cite score is not avaiable then the last two are empty
+            (3 lists of dicts with output='raw')
         '''
         if type(count) != int or count > 200:
             warnings.warn("count corrected to be 200", UserWarning)
@@ -246,9 +765,11 @@ class Scopus(object):
             view = 'CITESCORE'
         par = {'apiKey': self.apikey, 'title': title,
                 'count': count, 'view': view}
-        r = requests.get(APIURI.SERIAL_SEARCH, par)
-        return _parse_serial(r.json())
+        js = self._get_json('serial_search', APIURI.SERIAL_SEARCH, par)
+        return self._parse(APIURI.SERIAL_SEARCH, _parse_serial, js, self.output)
 
+    @_memoized
+    @_coalesced
     def retrieve_serial(self, issn, view='CITESCORE'):
         '''
             Retrieve serial title metadata, given issn
@@ -268,6 +789,7 @@ class Scopus(object):
                 - second one is the temporal citescore in each year
                 - last one is the temporal rank/percentile for each subject code in each year
             If cite score is not avaiable then the last two are empty
+            (3 lists of dicts with output='raw')
         '''
 
         if view not in ['STANDARD', 'ENHANCED', 'CITESCORE']:
@@ -275,10 +797,11 @@ class Scopus(object):
             view = 'CITESCORE'
         par = {'apiKey': self.apikey, 'view': view}
 
-        r = requests.get(APIURI.SERIAL_RETRIEVAL+issn,
-                         params=par)
-        return _parse_serial(r.json())
+        js = self._get_json('serial', APIURI.SERIAL_RETRIEVAL+issn, par)
+        return self._parse(APIURI.SERIAL_RETRIEVAL, _parse_serial, js, self.output)
 
+    @_memoized
+    @_coalesced
     def retrieve_affiliation(self, aff_id, view='STANDARD'):
         '''
             Retrieve affiliation profile, given id
@@ -297,8 +820,7 @@ class Scopus(object):
 
         par = {'apiKey': self.apikey, 'view': view, 'httpAccept': 'application/json'}
 
-        r = requests.get(APIURI.AFFL_RETRIEVAL+aff_id,
-                         params=par)
-        d = _parse_aff(r.json()['affiliation-retrieval-response'])
+        js = self._get_json('affiliation', APIURI.AFFL_RETRIEVAL+aff_id, par)
+        d = self._parse(APIURI.AFFL_RETRIEVAL, _parse_aff, js['affiliation-retrieval-response'])
         d['aff_id'] = aff_id
-        return d
+        return self._record(d, Affiliation)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+'''
+    Streaming Parquet/Arrow IPC writers for search, citation and serial results.
+    Requires pyarrow.
+'''
+
+from pyscopus.records import to_frame
+from pyscopus.utils import _to_str
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Writing Parquet/Arrow files requires pyarrow: pip install pyarrow')
+    return pyarrow
+
+def article_schema():
+    ''' typed schema of search results (type_=1) '''
+    pa = _pyarrow()
+    affiliation = pa.struct([('name', pa.string()), ('city', pa.string()), ('country', pa.string())])
+    return pa.schema([('scopus_id', pa.string()), ('title', pa.string()),
+                      ('publication_name', pa.string()), ('issn', pa.string()),
+                      ('isbn', pa.string()), ('eissn', pa.string()), ('volume', pa.string()),
+                      ('page_range', pa.string()), ('cover_date', pa.date32()),
+                      ('doi', pa.string()), ('citation_count', pa.int64()),
+                      ('affiliation', pa.list_(affiliation)),
+                      ('aggregation_type', pa.string()), ('subtype_description', pa.string()),
+                      ('authors', pa.list_(pa.string())), ('full_text', pa.string())])
+
+def author_schema():
+    ''' typed schema of author search results (type_=2) '''
+    pa = _pyarrow()
+    return pa.schema([('author_id', pa.string()), ('name', pa.string()),
+                      ('document_count', pa.int64()), ('affiliation', pa.string()),
+                      ('affiliation_id', pa.string())])
+
+def citation_schema(year_range):
+    ''' typed schema of retrieve_citation results for year_range '''
+    pa = _pyarrow()
+    columns = ['previous_citation'] + [str(yr) for yr in range(year_range[0], year_range[1]+1)]\
+            + ['later_citation', 'total_citation']
+    return pa.schema([('scopus_id', pa.string())] + [(col, pa.int64()) for col in columns])
+
+def _to_arrow_array(values, data_type):
+    import pandas as pd
+    pa = _pyarrow()
+    if pa.types.is_string(data_type):
+        values = [_to_str(v) for v in values]
+    elif pa.types.is_integer(data_type):
+        values = pd.to_numeric(pd.Series(values), errors='coerce').astype('Int64')
+    elif pa.types.is_date(data_type):
+        values = [None if pd.isnull(v) else v.date()
+                  for v in pd.to_datetime(pd.Series(values), errors='coerce')]
+    elif pa.types.is_list(data_type):
+        values = [v if isinstance(v, list) else None for v in values]
+    return pa.array(values, type=data_type, from_pandas=True)
+
+def to_arrow(df, schema=None):
+    '''
+        Convert a result data frame to a pyarrow.Table.
+
+        With a schema, every column is converted to its declared type
+        (missing columns become nulls, extra columns are dropped).
+        Without, types are inferred by pyarrow.
+    '''
+    pa = _pyarrow()
+    if schema is None:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    arrays = list()
+    for field in schema:
+        if field.name in df:
+            arrays.append(_to_arrow_array(list(df[field.name]), field.type))
+        else:
+            arrays.append(pa.nulls(df.shape[0], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+class FileSink(object):
+    '''
+        Write data frames to one Parquet or Arrow IPC file as they arrive,
+        one row group (record batch) per write, so memory stays bounded.
+        Works for any result frame, e.g. the serial frames of retrieve_serial
+        with an inferred schema.
+
+        Parameters
+        ----------
+        path : str
+            Output file.
+        schema : pyarrow.Schema
+            e.g. article_schema(), citation_schema(year_range). Default is
+            None: inferred from the first data frame written.
+        format : str
+            'parquet' (default) or 'arrow' (Arrow IPC file).
+    '''
+
+    def __init__(self, path, schema=None, format='parquet'):
+        if format not in ('parquet', 'arrow'):
+            raise ValueError('%s is not a valid format, use parquet or arrow' %format)
+        self.path = path
+        self.schema = schema
+        self.format = format
+        self.n_records = 0
+        self._writer = None
+        self._closed = False
+
+    def _open(self, schema):
+        pa = _pyarrow()
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self.path, schema)
+        return pa.ipc.new_file(self.path, schema)
+
+    def write(self, df):
+        if isinstance(df, list):
+            # records or dicts from a Scopus object with output='records'/'raw'
+            if len(df) > 0 and isinstance(df[0], dict):
+                import pandas as pd
+                df = pd.DataFrame(df)
+            else:
+                df = to_frame(df)
+        table = to_arrow(df, self.schema)
+        if self._writer is None:
+            if self.schema is None:
+                self.schema = table.schema
+            self._writer = self._open(self.schema)
+        elif table.schema != self.schema:
+            table = table.cast(self.schema)
+        self._writer.write_table(table)
+        self.n_records += table.num_rows
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is None:
+            # nothing written: still leave a valid, empty file behind
+            if self.schema is None:
+                return
+            self._writer = self._open(self.schema)
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
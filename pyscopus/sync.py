@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+'''
+    Incremental sync of author bibliographies into a local index
+'''
+
+import json, os, threading
+from datetime import date, timedelta
+from pyscopus.utils import _iter_pages, _write_atomic
+
+# results per page of the STANDARD view, used by the citation count refresh
+CITATION_PAGE_SIZE = 200
+
+class AuthorSync(object):
+    '''
+        Keep the publications of many authors up to date in a LocalIndex,
+        downloading only what changed since the previous sync.
+
+        The first sync of an author fetches the whole bibliography. Later
+        syncs only search for documents loaded into Scopus since the last
+        one (`au-id(...) AND ORIG-LOAD-DATE AFT yyyymmdd`) and add them to
+        the index. Citation counts of the documents already stored are
+        refreshed on demand with a light search that only returns ids and
+        counts, and only the articles whose count changed are rewritten.
+
+        Only the new documents scale with what changed: Scopus gives no way
+        to search for the documents whose citation count changed, so a
+        citation refresh still lists every document of the author, one
+        request per 200 documents. Refresh citations less often than the
+        sync to keep the cost down.
+
+        The date of the last sync of every author is kept in a JSON state
+        file, updated after each author.
+
+        Parameters
+        ----------
+        scopus : pyscopus.Scopus
+            Client used for the requests.
+        index : pyscopus.index.LocalIndex
+            Where the publications are stored.
+        path : str
+            State file.
+        date_field : str
+            Search field compared with the last sync date. Default is
+            'ORIG-LOAD-DATE'; 'LOAD-DATE' also catches updated documents.
+        count : int
+            Max number of documents per author. Default is 10000.
+    '''
+
+    def __init__(self, scopus, index, path, date_field='ORIG-LOAD-DATE', count=10000):
+        self.scopus = scopus
+        self.index = index
+        self.path = path
+        self.date_field = date_field
+        self.count = count
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+        else:
+            self.state = dict()
+
+    def _save_state(self):
+        _write_atomic(self.path, lambda f: json.dump(self.state, f))
+
+    def _search_to_index(self, query):
+        return self.scopus.search_to_index(query, self.index, count=self.count, cursor=True)
+
+    def _citation_counts(self, query):
+        '''
+            {scopus id: citation count} of every document matching query.
+
+            Pages hold 200 ids and counts (the maximum of the STANDARD view).
+            The cost scales with the number of documents of the author, not
+            with the number of counts that changed: one request per 200
+            documents, whether their counts changed or not.
+        '''
+        counts = dict()
+        next_cursor = '*'
+        while len(counts) < self.count:
+            page, total_count, current_cursor = self.scopus._search_page(
+                    query, 1, 'STANDARD', cursor=next_cursor, output='raw',
+                    fields='dc:identifier,citedby-count', count=CITATION_PAGE_SIZE)
+            for row in page:
+                counts[row['scopus_id']] = row['citation_count']
+            if len(page) == 0 or len(counts) >= total_count or current_cursor is None or\
+                    current_cursor == next_cursor:
+                break
+            next_cursor = current_cursor
+        return counts
+
+    def sync(self, author_id, refresh_citations=False):
+        '''
+            Bring the publications of one author up to date.
+
+            Parameters
+            ----------
+            author_id : str
+                Author id in Scopus database.
+            refresh_citations : bool
+                Also refresh the citation counts of the documents already
+                stored, at one request per 200 documents of the author.
+                Default is False.
+
+            Returns
+            -------
+            dict
+                'full' (whether the whole bibliography was fetched), 'added'
+                (documents fetched) and 'citations_updated'.
+        '''
+        author_id = str(author_id)
+        query = 'au-id(%s)' %author_id
+        # documents loaded on the day of the sync may come after it: overlap one day
+        started = (date.today() - timedelta(days=1)).strftime('%Y%m%d')
+        with self._lock:
+            last_sync = self.state.get(author_id)
+
+        result = {'full': last_sync is None, 'citations_updated': 0}
+        if last_sync is None:
+            result['added'] = self._search_to_index(query)
+        else:
+            result['added'] = self._search_to_index('%s AND %s AFT %s'
+                                                    %(query, self.date_field, last_sync['date']))
+            if refresh_citations:
+                counts = self._citation_counts(query)
+                result['citations_updated'] = self.index.set_citation_counts(counts)
+
+        with self._lock:
+            self.state[author_id] = {'date': started,
+                                     'n_records': self.index.count(author_id=author_id)}
+            self._save_state()
+        return result
+
+    def sync_all(self, author_id_array, refresh_citations=False, workers=1):
+        '''
+            sync every author, workers authors at a time
+
+            Returns
+            -------
+            dict
+                {author id: result of sync}
+        '''
+        author_id_list = [str(author_id) for author_id in author_id_array]
+
+        def sync_author(index):
+            return self.sync(author_id_list[index], refresh_citations)
+
+        return {author_id_list[index]: result for index, result in
+                _iter_pages(sync_author, range(len(author_id_list)), workers)}
+
+    def publications(self, author_id, output='frame'):
+        ''' stored publications of author_id, see LocalIndex.query '''
+        return self.index.query(output=output, author_id=str(author_id))
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+'''
+    HTTP transport used by Scopus objects
+'''
+
+import hashlib, json, os, random, threading, time
+from collections import defaultdict
+from pyscopus.cache import ResponseCache, UNCACHED_PARAMS
+from pyscopus.metrics import endpoint_of
+
+# status codes retried with backoff
+RETRY_STATUS = (429, 503)
+
+class ScopusHTTPError(ValueError):
+    '''
+        Raised when Scopus answers with a non-200 status code
+    '''
+
+    def __init__(self, status_code, url):
+        ValueError.__init__(self, 'HTTP %s for %s' %(status_code, url))
+        self.status_code = status_code
+        self.url = url
+
+class RateLimiter(object):
+    '''
+        Token bucket shared by all threads using a transport.
+
+        Besides limiting requests per second, it follows Elsevier's
+        X-RateLimit-Remaining/X-RateLimit-Reset headers: once the quota is
+        used up, every request waits for the reset time if it is at most
+        max_wait seconds away.
+
+        Parameters
+        ----------
+        rate : float
+            Max requests per second. Default is None (no limit).
+        burst : int
+            Number of requests allowed back to back before rate applies.
+        max_wait : float
+            Longest pause (in seconds) taken for an exhausted quota.
+    '''
+
+    def __init__(self, rate=None, burst=1, max_wait=60):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.remaining = None
+        self.reset = None
+        self._tokens = burst
+        self._last = time.time()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        '''
+            Block until a request may be sent
+        '''
+        with self._lock:
+            now = time.time()
+            wait = self._paused_until - now
+            if self.rate is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._last)*self.rate)
+                self._last = now
+                # tokens go negative to reserve a slot for every waiting thread
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens/self.rate)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def update(self, headers):
+        '''
+            Record quota headers from a response
+        '''
+        try:
+            self.remaining = int(headers['X-RateLimit-Remaining'])
+            self.reset = float(headers['X-RateLimit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+        if self.remaining <= 0:
+            wait = self.reset - time.time()
+            if 0 < wait <= self.max_wait:
+                self.pause(wait)
+
+class KeyPool(object):
+    '''
+        Several API keys used in turn, each with its own RateLimiter.
+
+        Requests go to the keys round robin, skipping keys that are paused
+        (throttled) or whose X-RateLimit-Remaining quota is used up until its
+        X-RateLimit-Reset time. When no key is available, the one available
+        first is used (waiting for it if its limiter allows).
+
+        Parameters
+        ----------
+        keys : list of str
+            Elsevier api keys.
+        rate, burst, max_wait :
+            See RateLimiter; they apply to every key.
+    '''
+
+    def __init__(self, keys, rate=None, burst=1, max_wait=60):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.keys = list()
+        self.limiters = dict()
+        self.requests = defaultdict(int)
+        self.throttled = defaultdict(int)
+        self._next = 0
+        self._lock = threading.Lock()
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        with self._lock:
+            if key not in self.limiters:
+                self.keys.append(key)
+                self.limiters[key] = RateLimiter(self.rate, self.burst, self.max_wait)
+
+    def _available_at(self, key, now):
+        limiter = self.limiters[key]
+        available_at = limiter._paused_until
+        if limiter.remaining is not None and limiter.remaining <= 0 and limiter.reset is not None:
+            available_at = max(available_at, limiter.reset)
+        return available_at if available_at > now else 0
+
+    def select(self):
+        '''
+            Returns
+            -------
+            The key to use for the next request and its RateLimiter
+        '''
+        if len(self.keys) == 0:
+            raise ValueError('No api key in the pool')
+        now = time.time()
+        with self._lock:
+            n_keys = len(self.keys)
+            order = [self.keys[(self._next+i) % n_keys] for i in range(n_keys)]
+            available_at = [self._available_at(key, now) for key in order]
+            i = available_at.index(min(available_at))
+            self._next = (self._next + i + 1) % n_keys
+            key = order[i]
+            self.requests[key] += 1
+        return key, self.limiters[key]
+
+    def update(self, key, r):
+        ''' Record the quota headers and status of a response sent with key '''
+        self.limiters[key].update(r.headers)
+        if r.status_code in RETRY_STATUS:
+            with self._lock:
+                self.throttled[key] += 1
+
+    def usage(self):
+        '''
+            Returns
+            -------
+            dict
+                {key: {'requests', 'throttled', 'remaining', 'reset', 'available'}},
+                remaining and reset as last reported by Scopus (None before).
+        '''
+        now = time.time()
+        with self._lock:
+            return {key: {'requests': self.requests[key], 'throttled': self.throttled[key],
+                          'remaining': self.limiters[key].remaining,
+                          'reset': self.limiters[key].reset,
+                          'available': self._available_at(key, now) == 0}
+                    for key in self.keys}
+
+def _with_key(params, key):
+    # replace the key of the Scopus object by the one selected in the pool
+    params = dict(params) if params is not None else dict()
+    names = [name for name in UNCACHED_PARAMS if name in params]
+    for name in names or ['apikey']:
+        params[name] = key
+    return params
+
+class Transport(object):
+    '''
+        Pooled, keep-alive HTTP transport.
+
+        Every request made by a Scopus object goes through one instance of this
+        class, so connections to api.elsevier.com are reused instead of paying
+        a TCP+TLS handshake per call.
+
+        Any object with a `get(url, params=None)` method returning a
+        requests.Response-like object (`json()`, `status_code`, `headers`)
+        can be used in its place, e.g. a stub for local benchmarking.
+
+        Parameters
+        ----------
+        pool_connections : int
+            Number of per-host connection pools to cache.
+        pool_maxsize : int
+            Max number of connections kept alive for a single host.
+        timeout : float or tuple
+            Timeout in seconds, either one value or (connect, read).
+        keep_alive : bool
+            Whether to keep connections open between requests.
+        headers : dict
+            Extra headers sent with every request.
+        rate_limit : float or RateLimiter
+            Max requests per second, or a RateLimiter shared with other
+            transports. Default is None (only quota headers are followed).
+        max_retries : int
+            Number of retries for throttled (429/503) responses. A response
+            whose Retry-After is longer than the max_wait of the rate limiter
+            is returned without retrying.
+        backoff : float
+            Base delay in seconds of the jittered exponential backoff, which
+            is capped at max_wait.
+        metrics : pyscopus.metrics.Metrics
+            Where retries and rate limit headroom are recorded. Default is None.
+        key_pool : KeyPool
+            Spread requests over several api keys, replacing the key in the
+            request parameters. Quota headers and throttling are then tracked
+            per key, and a throttled request is retried with another key.
+            Default is None (the key given by the Scopus object is used).
+    '''
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, timeout=(5, 60),
+                 keep_alive=True, headers=None, rate_limit=None, max_retries=5,
+                 backoff=1.0, metrics=None, key_pool=None):
+        self.timeout = timeout
+        self.metrics = metrics
+        self.key_pool = key_pool
+        if not isinstance(rate_limit, RateLimiter):
+            rate_limit = RateLimiter(rate_limit)
+        self.rate_limiter = rate_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        if headers is not None:
+            self.session.headers.update(headers)
+
+    def get(self, url, params=None):
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            if self.key_pool is None:
+                limiter = self.rate_limiter
+                r = self.session.get(url, params=params, timeout=self.timeout)
+                limiter.update(r.headers)
+            else:
+                key, limiter = self.key_pool.select()
+                limiter.acquire()
+                r = self.session.get(url, params=_with_key(params, key), timeout=self.timeout)
+                self.key_pool.update(key, r)
+            if self.metrics is not None and limiter.remaining is not None:
+                self.metrics.set('ratelimit_remaining', endpoint_of(url), limiter.remaining)
+            if r.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                return r
+            if self.metrics is not None:
+                self.metrics.inc('retries_total', endpoint_of(url))
+            delay = self._retry_delay(r, attempt, limiter.max_wait)
+            if delay is None:
+                # waiting would stop every thread sharing the limiter for too long
+                return r
+            # with a key pool only this key backs off, the retry goes to another one
+            limiter.pause(delay)
+            attempt += 1
+
+    def _retry_delay(self, r, attempt, max_wait):
+        '''
+            Seconds to wait before retrying a throttled response: its
+            Retry-After header, else the jittered exponential backoff capped
+            at max_wait. None if Retry-After is longer than max_wait or invalid.
+        '''
+        try:
+            delay = float(r.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return min(self.backoff * 2**attempt * random.uniform(0.5, 1.5), max_wait)
+        if not 0 <= delay <= max_wait:
+            return None
+        return delay
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def _fixture_name(url, params):
+    # the api key is left out so fixtures can be shared
+    key = ResponseCache.make_key('fixture', url, params)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+
+class RecordedResponse(object):
+    '''
+        Minimal requests.Response stand-in built from a fixture file
+    '''
+
+    def __init__(self, url, status_code, headers, text):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+
+    @property
+    def content(self):
+        return self.text.encode('utf-8')
+
+    def json(self):
+        return json.loads(self.text)
+
+class RecordingTransport(object):
+    '''
+        Send requests through another transport and save every response as a
+        fixture file (one JSON file per url and parameters, api key excluded)
+        under path, for later use with ReplayTransport.
+    '''
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = Transport() if transport is None else transport
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+    def get(self, url, params=None):
+        r = self.transport.get(url, params=params)
+        fixture = {'url': url, 'status_code': r.status_code,
+                   'headers': dict(r.headers), 'text': r.text}
+        with open(os.path.join(self.path, _fixture_name(url, params)), 'w') as f:
+            json.dump(fixture, f)
+        return r
+
+class ReplayTransport(object):
+    '''
+        Serve responses from fixture files written by RecordingTransport,
+        without network access or api key.
+
+        Parameters
+        ----------
+        path : str
+            Fixture directory.
+        latency : float
+            Seconds slept before each response, to simulate round trips.
+    '''
+
+    def __init__(self, path, latency=0):
+        self.path = path
+        self.latency = latency
+
+    def get(self, url, params=None):
+        file_path = os.path.join(self.path, _fixture_name(url, params))
+        if not os.path.exists(file_path):
+            raise KeyError('No fixture for %s %s' %(url, params))
+        with open(file_path) as f:
+            fixture = json.load(f)
+        if self.latency:
+            time.sleep(self.latency)
+        return RecordedResponse(fixture['url'], fixture['status_code'],
+                                fixture['headers'], fixture['text'])
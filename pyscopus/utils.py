@@ -3,9 +3,11 @@
     Helper Functions
 '''
 
-import requests
-import numpy as np
-import pandas as pd
+import os, warnings
+from collections import deque
+from operator import attrgetter
+from pyscopus.records import Article, Author, CitationRow
+from concurrent.futures import ThreadPoolExecutor
 
 def _parse_aff(js_aff):
     ''' example: https://dev.elsevier.com/payloads/retrieval/affiliationRetrievalResp.xml'''
@@ -39,22 +41,20 @@ def _parse_aff(js_aff):
 
 
 def _parse_serial_citescore(serial_entry_citescore):
-    citescore_df = list()
-    subjectrank_df = list()
+    citescore_list = list()
+    subjectrank_list = list()
     for citescore_d in serial_entry_citescore:
         d = {'year': citescore_d['@year'],
              'status': citescore_d['@status'],
             }
         info_d = citescore_d['citeScoreInformationList'][0]['citeScoreInfo'][0]
         d.update({k: v for k, v in info_d.items() if k!='@_fa' and k!='citeScoreSubjectRank'})
-        citescore_df.append(d)
-        sj_df = pd.DataFrame(info_d['citeScoreSubjectRank'])
-        sj_df['year'] = d['year']
-        subjectrank_df.append(sj_df)
-    citescore_df = pd.DataFrame(citescore_df)
-    subjectrank_df = pd.concat(subjectrank_df, ignore_index=True)
-    subjectrank_df.drop(columns=['@_fa'], inplace=True)
-    return citescore_df, subjectrank_df
+        citescore_list.append(d)
+        for rank_d in info_d['citeScoreSubjectRank']:
+            sj_d = {k: v for k, v in rank_d.items() if k!='@_fa'}
+            sj_d['year'] = d['year']
+            subjectrank_list.append(sj_d)
+    return citescore_list, subjectrank_list
 
 def _parse_serial_entry(serial_entry):
     keys_not_wanted = ['SNIPList', 'SJRList', 'prism:url', 'link', '@_fa']
@@ -63,45 +63,53 @@ def _parse_serial_entry(serial_entry):
     entry_meta['subject-area'] = [sj['@code'] for sj in entry_meta['subject-area']]
     try:
         entry_citescore = serial_entry['citeScoreYearInfoList']['citeScoreYearInfo']
-        entry_cs_df, entry_sj_df = _parse_serial_citescore(entry_citescore)
-        entry_cs_df['source-id'] = entry_meta['source-id']
-        entry_sj_df['source-id'] = entry_meta['source-id']
-        entry_cs_df['prism:issn'] = entry_meta['prism:issn']
-        entry_sj_df['prism:issn'] = entry_meta['prism:issn']
+        entry_cs_list, entry_sj_list = _parse_serial_citescore(entry_citescore)
+        for d in entry_cs_list + entry_sj_list:
+            d['source-id'] = entry_meta['source-id']
+            d['prism:issn'] = entry_meta['prism:issn']
     except:
-        ## if citescore not found, return empty dataframe
-        entry_cs_df, entry_sj_df = pd.DataFrame(), pd.DataFrame()
-    return entry_meta, entry_cs_df, entry_sj_df
-
-def _parse_serial(serial_json):
-    meta_df = list()
-    cs_df = list()
-    sj_df = list()
+        ## if citescore not found, no rows
+        entry_cs_list, entry_sj_list = list(), list()
+    return entry_meta, entry_cs_list, entry_sj_list
+
+def _parse_serial(serial_json, output='frame'):
+    '''
+        Meta information, citescores and subject ranks, as 3 data frames,
+        or 3 lists of dicts if output is 'raw'
+    '''
+    meta_list = list()
+    cs_list = list()
+    sj_list = list()
     collected_source_id_list = list()
     for entry in serial_json['serial-metadata-response']['entry']:
-        entry_meta, entry_cs_df, entry_sj_df = _parse_serial_entry(entry)
+        entry_meta, entry_cs_list, entry_sj_list = _parse_serial_entry(entry)
         if entry_meta['source-id'] in collected_source_id_list:
             continue
         collected_source_id_list.append(entry_meta['source-id'])
-        meta_df.append(entry_meta)
-        cs_df.append(entry_cs_df)
-        sj_df.append(entry_sj_df)
-    meta_df = pd.DataFrame(meta_df)
-    cs_df = pd.concat(cs_df, ignore_index=True)
-    sj_df = pd.concat(sj_df, ignore_index=True)
-    return meta_df, cs_df, sj_df
+        meta_list.append(entry_meta)
+        cs_list.extend(entry_cs_list)
+        sj_list.extend(entry_sj_list)
+    if output == 'raw':
+        return meta_list, cs_list, sj_list
+    import pandas as pd
+    return pd.DataFrame(meta_list), pd.DataFrame(cs_list), pd.DataFrame(sj_list)
 
 from pyscopus import APIURI
 
-def _parse_citation(js_citation, year_range):
+def _parse_citation(js_citation, year_range, output='frame'):
+    '''
+        Data frame of citation counts, list of CitationRow if output is
+        'records', list of dicts if output is 'raw'. Papers without counts
+        are left out.
+    '''
     resp = js_citation['abstract-citations-response']
     cite_info_list = resp['citeInfoMatrix']['citeInfoMatrixXML']['citationMatrix']['citeInfo']
 
     year_range = (year_range[0], year_range[1]+1)
     columns = ['scopus_id', 'previous_citation'] + [str(yr) for yr in range(*year_range)] + ['later_citation', 'total_citation']
-    citation_df = pd.DataFrame(columns=columns)
+    cite_dict_list = list()
 
-    year_arr = np.arange(year_range[0], year_range[1]+1)
+    year_arr = range(year_range[0], year_range[1]+1)
     for cite_info in cite_info_list:
         cite_dict = {}
         # dc:identifier: scopus id
@@ -110,12 +118,13 @@ def _parse_citation(js_citation, year_range):
         try:
             cite_dict['previous_citation'] = cite_info['pcc']
         except:
-            cite_dict['previous_citation'] = pd.np.NaN
+            cite_dict['previous_citation'] = float('nan')
         # cc: citation counts during year range
         try:
             cc = cite_info['cc']
         except:
-            return pd.DataFrame()
+            # skip this paper only, not the rest of the chunk
+            continue
         for index in range(len(cc)):
             year = str(year_arr[index])
             cite_dict[year] = cc[index]['$']
@@ -123,15 +132,58 @@ def _parse_citation(js_citation, year_range):
         try:
             cite_dict['later_citation'] = cite_info['lcc']
         except:
-            cite_dict['later_citation'] = pd.np.NaN
+            cite_dict['later_citation'] = float('nan')
         # rowTotal: total citation counts
         try:
             cite_dict['total_citation'] = cite_info['rowTotal']
         except:
-            cite_dict['total_citation'] = pd.np.NaN
-        citation_df = citation_df.append(cite_dict, ignore_index=True)
+            cite_dict['total_citation'] = float('nan')
+        cite_dict_list.append(cite_dict)
+
+    if output == 'records':
+        return [CitationRow(d['scopus_id'], d['previous_citation'], year_range[0],
+                            tuple(d.get(column) for column in columns[2:-2]),
+                            d['later_citation'], d['total_citation']) for d in cite_dict_list]
+    if output == 'raw':
+        return cite_dict_list
+    import pandas as pd
+    # build the frame once instead of copying it for every paper
+    return pd.DataFrame(cite_dict_list, columns=columns)
+
+def _warn_missing_citations(n_found, n_requested):
+    if n_found < n_requested:
+        warnings.warn("%i of %i scopus ids missing from the citation counts"
+                      %(n_requested-n_found, n_requested), UserWarning)
+
+def _parse_citation_panel(js_citation, year_range, panel):
+    '''
+        Write the citation counts of js_citation into the rows of panel, an
+        integer array with one column per year of year_range plus previous,
+        later and total counts (previous_citation first). Papers without
+        counts are skipped and missing counts are 0.
 
-    return citation_df[columns]
+        Returns
+        -------
+        Scopus ids of the rows written, in order
+    '''
+    resp = js_citation['abstract-citations-response']
+    cite_info_list = resp['citeInfoMatrix']['citeInfoMatrixXML']['citationMatrix']['citeInfo']
+
+    n_years = year_range[1] - year_range[0] + 1
+    scopus_id_list = list()
+    for cite_info in cite_info_list:
+        if len(scopus_id_list) == panel.shape[0]:
+            break
+        try:
+            cc = [int(c['$']) for c in cite_info['cc'][:n_years]]
+        except:
+            continue
+        cc.extend([0]*(n_years-len(cc)))
+        # one row assignment instead of one per cell
+        panel[len(scopus_id_list)] = [_to_int(cite_info.get('pcc')) or 0] + cc +\
+                [_to_int(cite_info.get('lcc')) or 0, _to_int(cite_info.get('rowTotal')) or 0]
+        scopus_id_list.append(cite_info['dc:identifier'].split(':')[-1])
+    return scopus_id_list
 
 def _parse_affiliation(js_affiliation):
     l = list()
@@ -178,128 +230,134 @@ def _parse_author_affiliation(js_affiliation_entry):
     return affiliation_dict
 
 def _parse_affiliation_history(js_affiliation_history):
-    columns = ('id', 'name', 'parent-id', 'parent-name', 'url')
-    affiliation_history_df = pd.DataFrame(columns=columns)
-
-    for affiliation in js_affiliation_history:
-        affiliation_history_df = affiliation_history_df.append(\
-                                    _parse_author_affiliation(affiliation), \
-                                    ignore_index=True)
-    return affiliation_history_df
-
-def _parse_author(entry):
-    #print(entry)
-    author_id = entry['dc:identifier'].split(':')[-1]
-    lastname = entry['preferred-name']['surname']
-    firstname = entry['preferred-name']['given-name']
-    doc_count = int(entry['document-count'])
-    # affiliations
-    if 'affiliation-current' in entry:
-        affil = entry['affiliation-current']
-        try:
-            institution_name = affil['affiliation-name']
-        except:
-            institution_name = None
-        try:
-            institution_id = affil['affiliation-id']
-        except:
-            institution_id = None
-    else:
-        institution_name = None
-        institution_id = None
-    #city = affil.find('affiliation-city').text
-    #country = affil.find('affiliation-country').text
-    #affiliation = institution + ', ' + city + ', ' + country
-
-    return pd.Series({'author_id': author_id, 'name': firstname + ' ' + lastname, 'document_count': doc_count,\
-            'affiliation': institution_name, 'affiliation_id': institution_id})
+    columns = ('id', 'name', 'parent-id', 'parent-name', 'url', 'address')
+    affiliation_list = [_parse_author_affiliation(affiliation)\
+                        for affiliation in js_affiliation_history]
+    import pandas as pd
+    return pd.DataFrame(affiliation_list, columns=columns)
 
-def _parse_article(entry):
-    try:
-        scopus_id = entry['dc:identifier'].split(':')[-1]
-    except:
-        scopus_id = None
-    try:
-        title = entry['dc:title']
-    except:
-        title = None
-    try:
-        publicationname = entry['prism:publicationName']
-    except:
-        publicationname = None
-    try:
-        issn = entry['prism:issn']
-    except:
-        issn = None
-    try:
-        isbn = entry['prism:isbn']
-    except:
-        isbn = None
-    try:
-        eissn = entry['prism:eIssn']
-    except:
-        eissn = None
-    try:
-        volume = entry['prism:volume']
-    except:
-        volume = None
-    try:
-        pagerange = entry['prism:pageRange']
-    except:
-        pagerange = None
-    try:
-        coverdate = entry['prism:coverDate']
-    except:
-        coverdate = None
-    try:
-        doi = entry['prism:doi']
-    except:
-        doi = None
-    try:
-        citationcount = int(entry['citedby-count'])
-    except:
-        citationcount = None
+def _split_id(identifier):
     try:
-        affiliation = _parse_affiliation(entry['affiliation'])
+        return identifier.split(':')[-1]
     except:
-        affiliation = None
-    try:
-        aggregationtype = entry['prism:aggregationType']
-    except:
-        aggregationtype = None
+        return None
+
+def _to_int(value):
     try:
-        sub_dc = entry['subtypeDescription']
+        return int(value)
     except:
-        sub_dc = None
+        return None
+
+def _parse_author_id_list(author_entry):
     try:
-        author_entry = entry['author']
-        author_id_list = [auth_entry['authid'] for auth_entry in author_entry]
+        return [auth_entry['authid'] for auth_entry in author_entry]
     except:
-        author_id_list = list()
+        return list()
+
+def _parse_full_text_link(link_list):
     try:
-        link_list = entry['link']
         full_text_link = None
         for link in link_list:
             if link['@ref'] == 'full-text':
                 full_text_link = link['@href']
+        return full_text_link
     except:
-        full_text_link = None
+        return None
 
-    return pd.Series({'scopus_id': scopus_id, 'title': title, 'publication_name':publicationname,\
-            'issn': issn, 'isbn': isbn, 'eissn': eissn, 'volume': volume, 'page_range': pagerange,\
-            'cover_date': coverdate, 'doi': doi,'citation_count': citationcount, 'affiliation': affiliation,\
-            'aggregation_type': aggregationtype, 'subtype_description': sub_dc, 'authors': author_id_list,\
-            'full_text': full_text_link})
+def _parse_affiliation_or_none(js_affiliation):
+    try:
+        return _parse_affiliation(js_affiliation)
+    except:
+        return None
+
+# column -> search entry key for fields copied as they are
+ARTICLE_FIELDS = (('title', 'dc:title'), ('publication_name', 'prism:publicationName'),
+                  ('issn', 'prism:issn'), ('isbn', 'prism:isbn'), ('eissn', 'prism:eIssn'),
+                  ('volume', 'prism:volume'), ('page_range', 'prism:pageRange'),
+                  ('cover_date', 'prism:coverDate'), ('doi', 'prism:doi'),
+                  ('aggregation_type', 'prism:aggregationType'),
+                  ('subtype_description', 'subtypeDescription'))
+
+# search entry key -> attribute of the entries decoded by decoding.search_page_decoder
+ENTRY_ATTRIBUTES = dict([(key, column) for column, key in ARTICLE_FIELDS] +
+                        [('dc:identifier', 'identifier'), ('citedby-count', 'citedby_count'),
+                         ('affiliation', 'affiliation'), ('author', 'author'), ('link', 'link')])
+
+ARTICLE_COLUMNS = Article.columns
+
+AUTHOR_COLUMNS = Author.columns
+
+def _columns_output(columns, record_class, output):
+    if output == 'records':
+        return [record_class(*row) for row in zip(*[columns[key] for key in record_class.columns])]
+    if output == 'raw':
+        return [dict(zip(record_class.columns, row))
+                for row in zip(*[columns[key] for key in record_class.columns])]
+    import pandas as pd
+    return pd.DataFrame(columns, columns=record_class.columns)
+
+def _article_columns(values):
+    '''
+        Article columns of a search page, where values(key) lists the values
+        of the search entry key, one per entry
+    '''
+    columns = {key: values(field) for key, field in ARTICLE_FIELDS}
+    columns['scopus_id'] = [_split_id(value) for value in values('dc:identifier')]
+    columns['citation_count'] = [_to_int(value) for value in values('citedby-count')]
+    columns['affiliation'] = [_parse_affiliation_or_none(value) for value in values('affiliation')]
+    columns['authors'] = [_parse_author_id_list(value) for value in values('author')]
+    columns['full_text'] = [_parse_full_text_link(value) for value in values('link')]
+    return columns
+
+def _parse_articles(entries, output='frame'):
+    '''
+        Articles of a search page: extract each field for the whole page at
+        once and build the data frame from the column lists, Article records
+        if output is 'records' or dicts if output is 'raw'.
+    '''
+    return _columns_output(_article_columns(lambda key: [entry.get(key) for entry in entries]),
+                           Article, output)
 
-def _parse_entry(entry, type_):
+def _parse_authors(entries, output='frame'):
+    '''
+        Authors of an author search page, built column by column like
+        _parse_articles. Author records if output is 'records'.
+    '''
+    columns = {key: list() for key in AUTHOR_COLUMNS}
+    for entry in entries:
+        columns['author_id'].append(entry['dc:identifier'].split(':')[-1])
+        preferred_name = entry['preferred-name']
+        columns['name'].append(preferred_name['given-name'] + ' ' + preferred_name['surname'])
+        columns['document_count'].append(int(entry['document-count']))
+        affil = entry.get('affiliation-current')
+        if affil is None:
+            affil = {}
+        columns['affiliation'].append(affil.get('affiliation-name'))
+        columns['affiliation_id'].append(affil.get('affiliation-id'))
+    return _columns_output(columns, Author, output)
+
+def _parse_entries(entries, type_, output='frame'):
     if type_ == 1 or type_ == 'article':
-        return _parse_article(entry)
+        return _parse_articles(entries, output)
     else:
-        return _parse_author(entry)
+        return _parse_authors(entries, output)
 
 def _parse_author_retrieval(author_entry):
-    resp = author_entry['author-retrieval-response'][0]
+    return _parse_author_retrieval_response(author_entry['author-retrieval-response'][0])
+
+def _parse_author_retrieval_list(author_list_entry):
+    ''' multi-id author retrieval: one dict per author, None for authors not found'''
+    if 'author-retrieval-response-list' in author_list_entry:
+        author_list_entry = author_list_entry['author-retrieval-response-list']
+    author_dict_list = list()
+    for resp in author_list_entry['author-retrieval-response']:
+        try:
+            author_dict_list.append(_parse_author_retrieval_response(resp))
+        except:
+            author_dict_list.append(None)
+    return author_dict_list
 
+def _parse_author_retrieval_response(resp):
     # create a dict to store the data
     author_dict = {}
 
@@ -352,10 +410,9 @@ def _parse_abstract_retrieval(abstract_entry):
 
     return abstract_dict
 
-def _search_scopus(key, query, type_, view, index=0):
+def _search_request(key, query, type_, view, index=0, cursor=None, fields=None, count=None):
     '''
-        Search Scopus database using key as api key, with query.
-        Search author or articles depending on type_
+        URL and parameters of one search page
 
         Parameters
         ----------
@@ -368,32 +425,89 @@ def _search_scopus(key, query, type_, view, index=0):
         view : string
             Returned result view (i.e., return fields). Can only be STANDARD for author search.
         index : int
-            Start index. Will be used in search_scopus_plus function
-
-        Returns
-        -------
-        pandas DataFrame
+            Start index.
+        cursor : string
+            Cursor for deep pagination ('*' for the first page). Used instead of
+            index; only supported by article search.
+        fields : string
+            Restricts the fields returned, e.g. 'dc:identifier,citedby-count'.
+        count : int
+            Results per page. Default (None) is the API default of 25; at most
+            25 with the COMPLETE view and 200 with STANDARD.
     '''
-
-    par = {'apikey': key, 'query': query, 'start': index,
-           'httpAccept': 'application/json', 'view': view}
+    par = {'apikey': key, 'query': query, 'httpAccept': 'application/json', 'view': view}
+    if fields is not None:
+        par['field'] = fields
+    if count is not None:
+        par['count'] = count
+    if cursor is not None:
+        par['cursor'] = cursor
+    else:
+        par['start'] = index
     if type_ == 'article' or type_ == 1:
-        r = requests.get(APIURI.SEARCH, params=par)
+        return APIURI.SEARCH, par
     else:
         par['view'] = 'STANDARD'
-        r = requests.get(APIURI.SEARCH_AUTHOR, params=par)
+        return APIURI.SEARCH_AUTHOR, par
 
-    js = r.json()
-    #print(r.url)
+def _check_cursor(type_, cursor):
+    if cursor and not (type_ == 1 or type_ == 'article'):
+        raise ValueError('cursor pagination is only supported by article search, not type_=%s' %type_)
+
+def _parse_search_page(js, type_, output='frame'):
+    '''
+        Returns
+        -------
+        Data frame of the page, total count and next cursor (None if absent)
+    '''
     total_count = int(js['search-results']['opensearch:totalResults'])
     entries = js['search-results']['entry']
 
-    result_df = pd.DataFrame([_parse_entry(entry, type_) for entry in entries])
+    result_df = _parse_entries(entries, type_, output)
 
-    if index == 0:
-        return(result_df, total_count)
-    else:
-        return(result_df)
+    try:
+        next_cursor = js['search-results']['cursor']['@next']
+    except KeyError:
+        next_cursor = None
+    return result_df, total_count, next_cursor
+
+def _parse_search_page_struct(page, output='frame'):
+    '''
+        _parse_search_page of an article search page decoded by
+        decoding.search_page_decoder (attributes instead of dict keys);
+        the fields are parsed by the same functions as in _parse_articles.
+    '''
+    results = page.results
+    if results is None:
+        raise KeyError('search-results')
+    total_count = int(results.total)
+    entries = results.entry if results.entry is not None else list()
+
+    columns = _article_columns(lambda key: list(map(attrgetter(ENTRY_ATTRIBUTES[key]), entries)))
+
+    next_cursor = results.cursor.next if results.cursor is not None else None
+    return _columns_output(columns, Article, output), total_count, next_cursor
+
+def _iter_pages(fetch_page, indices, workers=1):
+    '''
+        Yield (index, fetch_page(index)) in the order of indices.
+        With workers > 1, keep at most that many pages in flight on a thread pool.
+    '''
+    if workers <= 1:
+        for index in indices:
+            yield index, fetch_page(index)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for index in indices:
+            pending.append((index, executor.submit(fetch_page, index)))
+            if len(pending) >= workers:
+                index, future = pending.popleft()
+                yield index, future.result()
+        while pending:
+            index, future = pending.popleft()
+            yield index, future.result()
 
 def trunc(s,min_pos=0,max_pos=75,ellipsis=True):
     """Truncation beautifier function
@@ -478,3 +592,24 @@ def trunc(s,min_pos=0,max_pos=75,ellipsis=True):
             if end == NOT_FOUND:
                 end = max_pos
         return s[0:end] + suffix
+
+def _write_atomic(file_path, write):
+    '''
+        Call write(f) on a temporary file then move it to file_path, so a
+        crash never leaves a partial file
+    '''
+    with open(file_path + '.tmp', 'w') as f:
+        write(f)
+    os.replace(file_path + '.tmp', file_path)
+
+def _is_missing(value):
+    # missing values of a data frame come as None or NaN
+    return value is None or (isinstance(value, float) and value != value)
+
+def _to_str(value):
+    if _is_missing(value):
+        return None
+    if isinstance(value, list):
+        # e.g. prism:isbn comes as [{'@_fa': 'true', '$': '...'}]
+        return ','.join(v['$'] if isinstance(v, dict) else str(v) for v in value)
+    return str(value)
@@ -68,9 +68,12 @@ setup(
 
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
-        'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
         'Programming Language :: Python :: 3.6',
     ],
 
+    # AsyncScopus (async def) is imported with the package
+    python_requires='>=3.6',
+
     keywords='scopus python api document retrieval information scholar academic',
 )
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pyscopus import Scopus
+from pyscopus.transport import RecordedResponse, ReplayTransport
+from payloads import HEADERS
+from record_fixtures import FIXTURE_PATH
+
+class CountingTransport(object):
+    ''' count the requests sent through another transport '''
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.requests = list()
+
+    def get(self, url, params=None):
+        self.requests.append((url, dict(params or {})))
+        return self.transport.get(url, params=params)
+
+class FailingTransport(CountingTransport):
+    ''' raise ConnectionError from the request number fail_at on '''
+
+    def __init__(self, transport, fail_at):
+        CountingTransport.__init__(self, transport)
+        self.fail_at = fail_at
+
+    def get(self, url, params=None):
+        if len(self.requests) >= self.fail_at:
+            raise ConnectionError('connection reset')
+        return CountingTransport.get(self, url, params)
+
+class ReplaySession(object):
+    '''
+        requests.Session stand-in for pyscopus.transport.Transport, serving
+        fixtures. respond(url, params) may return a response (e.g. a 429)
+        sent instead of the fixture.
+    '''
+
+    def __init__(self, replay, respond=None):
+        self.replay = replay
+        self.respond = respond
+        self.requests = list()
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append((url, dict(params or {})))
+        if self.respond is not None:
+            r = self.respond(url, params)
+            if r is not None:
+                return r
+        return self.replay.get(url, params=params)
+
+    def close(self):
+        pass
+
+class AsyncReplaySession(ReplaySession):
+    ''' aiohttp.ClientSession stand-in for AsyncScopus, see ReplaySession '''
+
+    def get(self, url, params=None):
+        return AsyncReplayResponse(ReplaySession.get(self, url, params))
+
+    async def close(self):
+        pass
+
+class AsyncReplayResponse(object):
+    ''' aiohttp response stand-in, used as an async context manager '''
+
+    def __init__(self, r):
+        self.status = r.status_code
+        self.headers = r.headers
+        self.content = r.content
+
+    async def read(self):
+        return self.content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+def throttled(retry_after=None, headers=None):
+    ''' 429 response, as sent by Scopus once a quota is used up '''
+    headers = dict(HEADERS, **(headers or {}))
+    if retry_after is not None:
+        headers['Retry-After'] = str(retry_after)
+    return RecordedResponse('', 429, headers, '{"error-response": {"error-code": "TOO_MANY_REQUESTS"}}')
+
+@pytest.fixture
+def replay():
+    return ReplayTransport(FIXTURE_PATH)
+
+@pytest.fixture
+def make_scopus(replay):
+    ''' Scopus object factory, replaying the fixtures unless a transport is given '''
+    def make_scopus(transport=None, **kwargs):
+        return Scopus('replay', transport=replay if transport is None else transport, **kwargs)
+    return make_scopus
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+'''
+    Synthetic Scopus API payloads and a stub transport serving them.
+
+    The payloads follow the JSON layout of the Scopus APIs (search, author,
+    abstract, citation overview, serial title and affiliation) and are
+    deterministic, so fixtures recorded from ScopusStub never change. They
+    also carry the irregularities met in real responses: missing fields,
+    affiliations without a city, authors without id, papers without
+    citation counts and ids that are not found.
+'''
+
+import json
+from pyscopus import APIURI
+from pyscopus.transport import RecordedResponse
+
+QUERY = 'TITLE-ABS-KEY(bibliometrics)'
+EMPTY_QUERY = 'TITLE-ABS-KEY(qwertyuiop)'
+N_ARTICLES = 60
+AUTHOR_QUERY = 'AUTHLASTNAME(Zuo)'
+N_AUTHORS = 30
+AUTHOR_IDS = ['5719%06d' %i for i in range(12)]
+MISSING_AUTHOR_ID = '9999999999'
+SCOPUS_IDS = ['85%09d' %i for i in range(N_ARTICLES)]
+MISSING_SCOPUS_ID = '84999999999'
+# papers of the citation overview without counts ('cc')
+NO_COUNT_IDS = [SCOPUS_IDS[7]]
+YEAR_RANGE = (2015, 2019)
+SERIAL_TITLE = 'Scientometrics'
+ISSN = '0138-9130'
+AFFILIATION_ID = '60012281'
+
+HEADERS = {'Content-Type': 'application/json;charset=UTF-8',
+           'X-RateLimit-Limit': '20000', 'X-RateLimit-Remaining': '19000',
+           'X-RateLimit-Reset': '1767225600'}
+
+ABSTRACT_TEXT = ('Citation analysis is used to evaluate the research output of authors, '
+                 'institutions and journals. We compare indicators computed from '
+                 'bibliographic databases and discuss their limits. ') * 2
+
+AFFILIATIONS = [('University of Iowa', 'Iowa City', 'United States'),
+                ('Leiden University', 'Leiden', 'Netherlands'),
+                ('Universidad de Granada', 'Granada', 'Spain'),
+                ('Peking University', 'Beijing', 'China')]
+
+def article_entry(i, load_date='20190101'):
+    '''
+        Search entry (COMPLETE view) of article i. Some entries miss fields:
+        no ISBN but every 5th, no DOI every 7th, no citation count every
+        11th, an affiliation without city every 6th, an author without
+        authid every 8th, no affiliation every 9th, no full text every 3rd.
+    '''
+    scopus_id = '85%09d' %i
+    authors = [AUTHOR_IDS[(i + k) % len(AUTHOR_IDS)] for k in range(1 + i % 3)]
+    entry = {'@_fa': 'true',
+             'link': [{'@_fa': 'true', '@ref': 'self',
+                       '@href': 'https://api.elsevier.com/content/abstract/scopus_id/%s' %scopus_id},
+                      {'@_fa': 'true', '@ref': 'author-affiliation',
+                       '@href': 'https://api.elsevier.com/content/abstract/scopus_id/%s'
+                                '?field=author,affiliation' %scopus_id},
+                      {'@_fa': 'true', '@ref': 'scopus',
+                       '@href': 'https://www.scopus.com/inward/record.uri?partnerID=HzOxMe3b'
+                                '&scp=%s&origin=inward' %scopus_id}],
+             'prism:url': 'https://api.elsevier.com/content/abstract/scopus_id/%s' %scopus_id,
+             'dc:identifier': 'SCOPUS_ID:%s' %scopus_id,
+             'eid': '2-s2.0-%s' %scopus_id,
+             'dc:title': 'Indicators of research performance, part %i' %i,
+             'dc:creator': 'Author %i' %i,
+             'prism:publicationName': 'Scientometrics' if i % 2 == 0 else 'Journal of Informetrics',
+             'prism:issn': '01389130' if i % 2 == 0 else '17511577',
+             'prism:eIssn': '15882861' if i % 2 == 0 else '18755879',
+             'prism:volume': str(100 + i % 20),
+             'prism:issueIdentifier': str(1 + i % 4),
+             'prism:pageRange': '%i-%i' %(10*i + 1, 10*i + 9),
+             'prism:coverDate': '%i-%02i-01' %(2010 + i % 10, 1 + i % 12),
+             'prism:coverDisplayDate': '%i' %(2010 + i % 10),
+             'prism:doi': '10.1007/s11192-0%i-%04i-x' %(10 + i % 10, i),
+             'dc:description': ABSTRACT_TEXT,
+             'citedby-count': str((i * 37) % 101),
+             'affiliation': [{'@_fa': 'true', 'affilname': name, 'affiliation-city': city,
+                              'affiliation-country': country, 'afid': str(60000000 + k),
+                              'affiliation-url': 'https://api.elsevier.com/content/affiliation/'
+                                                 'affiliation_id/%i' %(60000000 + k)}
+                             for k, (name, city, country) in enumerate(AFFILIATIONS)
+                             if k <= i % len(AFFILIATIONS)],
+             'prism:aggregationType': 'Journal',
+             'subtype': 'ar' if i % 4 else 're',
+             'subtypeDescription': 'Article' if i % 4 else 'Review',
+             'author-count': {'@limit': '100', '@total': str(len(authors)), '$': str(len(authors))},
+             'author': [{'@_fa': 'true', '@seq': str(k + 1),
+                         'author-url': 'https://api.elsevier.com/content/author/author_id/%s' %authid,
+                         'authid': authid, 'authname': 'Author %s' %authid,
+                         'surname': 'Surname%s' %authid[-2:], 'given-name': 'Given',
+                         'initials': 'G.', 'afid': [{'@_fa': 'true', '$': '60000000'}]}
+                        for k, authid in enumerate(authors)],
+             'authkeywords': 'bibliometrics | citation analysis | h-index',
+             'source-id': '23925' if i % 2 == 0 else '5100155103',
+             'fund-no': 'undefined',
+             'openaccess': '0',
+             'openaccessFlag': False,
+             # not part of the responses, used to answer LOAD-DATE queries
+             '_load_date': load_date}
+    if i % 3:
+        entry['link'].append({'@_fa': 'true', '@ref': 'full-text',
+                              '@href': 'https://api.elsevier.com/content/article/eid/1-s2.0-%s'
+                                       %scopus_id})
+    if i % 5 == 0:
+        entry['prism:isbn'] = [{'@_fa': 'true', '$': '97831%05i' %i}]
+    if i % 7 == 0:
+        del entry['prism:doi']
+    if i % 11 == 0:
+        del entry['citedby-count']
+    if i % 6 == 0:
+        del entry['affiliation'][0]['affiliation-city']
+    if i % 8 == 0:
+        del entry['author'][0]['authid']
+    if i % 9 == 0:
+        del entry['affiliation']
+    return entry
+
+def author_entry(i):
+    ''' author search entry of author i, every 4th without current affiliation '''
+    entry = {'@_fa': 'true',
+             'prism:url': 'https://api.elsevier.com/content/author/author_id/5720%06d' %i,
+             'dc:identifier': 'AUTHOR_ID:5720%06d' %i,
+             'eid': '9-s2.0-5720%06d' %i,
+             'preferred-name': {'surname': 'Zuo', 'given-name': 'Given%i' %i, 'initials': 'G.'},
+             'name-variant': [{'@_fa': 'true', 'surname': 'Zuo', 'given-name': 'G.'}],
+             'document-count': str(3 + i),
+             'subject-area': [{'@abbrev': 'COMP', '@frequency': '12', '$': 'Computer Science'}]}
+    if i % 4:
+        name, city, country = AFFILIATIONS[i % len(AFFILIATIONS)]
+        entry['affiliation-current'] = {'affiliation-url': 'https://api.elsevier.com/content/'
+                                                           'affiliation/affiliation_id/6000000%i' %i,
+                                        'affiliation-id': '6000000%i' %(i % 10),
+                                        'affiliation-name': name, 'affiliation-city': city,
+                                        'affiliation-country': country}
+    return entry
+
+def search_page(entries, total, start=0, cursor=None, next_cursor=None):
+    ''' search-results payload of one page '''
+    results = {'opensearch:totalResults': str(total),
+               'opensearch:startIndex': str(start),
+               'opensearch:itemsPerPage': str(len(entries)),
+               'opensearch:Query': {'@role': 'request', '@searchTerms': 'query', '@startPage': str(start)},
+               'link': [{'@_fa': 'true', '@ref': 'self', '@href': 'https://api.elsevier.com/'
+                                                                  'content/search/scopus',
+                         '@type': 'application/json'}]}
+    if cursor is not None:
+        results['cursor'] = {'@current': cursor, '@next': next_cursor}
+    if len(entries) == 0:
+        results['entry'] = [{'@_fa': 'true', 'error': 'Result set was empty'}]
+    else:
+        results['entry'] = [{key: value for key, value in entry.items() if key != '_load_date'}
+                            for entry in entries]
+    return {'search-results': results}
+
+def author_retrieval_response(author_id):
+    i = int(author_id[-3:])
+    return {'@_fa': 'true',
+            'coredata': {'prism:url': 'https://api.elsevier.com/content/author/author_id/%s' %author_id,
+                         'dc:identifier': 'AUTHOR_ID:%s' %author_id,
+                         'eid': '9-s2.0-%s' %author_id,
+                         'document-count': str(10 + i),
+                         'cited-by-count': str(100 + 7*i),
+                         'citation-count': str(150 + 9*i)},
+            'author-profile': {'preferred-name': {'@source': 'auto', 'initials': 'Z.',
+                                                  'indexed-name': 'Zuo Z.', 'surname': 'Zuo',
+                                                  'given-name': 'Zhiya%i' %i},
+                               'publication-range': {'@end': '2019', '@start': str(2010 + i % 5)},
+                               'affiliation-history': {'affiliation': [affiliation_history_entry(k)
+                                                                       for k in range(3)]}}}
+
+def affiliation_history_entry(k):
+    name, city, country = AFFILIATIONS[k % len(AFFILIATIONS)]
+    return {'@affiliation-id': str(60000000 + k), '@parent': str(60000100 + k),
+            'ip-doc': {'@id': str(60000000 + k), '@type': 'dept',
+                       'afdispname': 'Department %i, %s' %(k, name),
+                       'parent-preferred-name': name,
+                       'address': {'address-part': '%i Main Street' %k, 'city': city,
+                                   'country': country},
+                       'org-URL': 'https://www.example.org/%i' %k}}
+
+def abstract_response(scopus_id):
+    i = int(scopus_id[-4:])
+    entry = article_entry(i)
+    coredata = {key: entry[key] for key in ('prism:url', 'dc:identifier', 'eid', 'dc:title',
+                                            'prism:publicationName', 'prism:issn', 'prism:volume',
+                                            'prism:pageRange', 'prism:coverDate', 'prism:doi',
+                                            'prism:aggregationType', 'subtypeDescription',
+                                            'citedby-count') if key in entry}
+    coredata['dc:description'] = ABSTRACT_TEXT
+    coredata['pubmed-id'] = str(29000000 + i)
+    coredata['dc:creator'] = {'author': [{'@auid': AUTHOR_IDS[0], 'ce:surname': 'Zuo'}]}
+    coredata['link'] = entry['link'][:2]
+    return {'abstracts-retrieval-response': {'coredata': coredata,
+                                             'authors': {'author': entry['author']},
+                                             'language': {'@xml:lang': 'eng'}}}
+
+def cite_info(scopus_id, year_range):
+    i = int(scopus_id[-4:])
+    n_years = year_range[1] - year_range[0] + 1
+    counts = [(i + 3*k) % 13 for k in range(n_years)]
+    info = {'@_fa': 'true', 'dc:identifier': 'SCOPUS_ID:%s' %scopus_id,
+            'prism:url': 'https://api.elsevier.com/content/abstract/scopus_id/%s' %scopus_id,
+            'dc:title': 'Indicators of research performance, part %i' %i,
+            'pcc': str(i % 5), 'cc': [{'$': str(count)} for count in counts],
+            'lcc': str(i % 3), 'rangeCount': str(sum(counts)),
+            'rowTotal': str(i % 5 + sum(counts) + i % 3)}
+    if scopus_id in NO_COUNT_IDS:
+        del info['cc']
+    return info
+
+def citation_response(scopus_id_list, year_range):
+    n_years = year_range[1] - year_range[0] + 1
+    found = [scopus_id for scopus_id in scopus_id_list if scopus_id != MISSING_SCOPUS_ID]
+    cite_info_list = [cite_info(scopus_id, year_range) for scopus_id in found]
+    return {'abstract-citations-response': {
+        'citeInfoMatrix': {'citeInfoMatrixXML': {'citationMatrix': {'citeInfo': cite_info_list}}},
+        'citeColumnTotalXML': {'citeCountHeader': {
+            'columnHeading': [{'$': str(year_range[0] + k)} for k in range(n_years)],
+            'columnTotal': [{'$': str(sum(int(info['cc'][k]['$']) for info in cite_info_list
+                                          if 'cc' in info))} for k in range(n_years)]}}}}
+
+def serial_entry(issn):
+    return {'@_fa': 'true', 'dc:title': SERIAL_TITLE, 'dc:publisher': 'Springer Netherlands',
+            'coverageStartYear': '1978', 'coverageEndYear': '2019', 'prism:aggregationType': 'journal',
+            'source-id': '23925', 'prism:issn': issn.replace('-', ''), 'prism:eIssn': '15882861',
+            'openaccess': None, 'openaccessArticle': None,
+            'subject-area': [{'@_fa': 'true', '@code': '3309', '@abbrev': 'SOCI', '$': 'Library'},
+                             {'@_fa': 'true', '@code': '1706', '@abbrev': 'COMP', '$': 'Applications'}],
+            'SNIPList': {'SNIP': [{'@_fa': 'true', '@year': '2018', '$': '1.509'}]},
+            'SJRList': {'SJR': [{'@_fa': 'true', '@year': '2018', '$': '1.210'}]},
+            'citeScoreYearInfoList': {
+                'citeScoreCurrentMetric': '2.92', 'citeScoreCurrentMetricYear': '2018',
+                'citeScoreYearInfo': [
+                    {'@_fa': 'true', '@year': str(year), '@status': 'Complete',
+                     'citeScoreInformationList': [{'@_fa': 'true', 'citeScoreInfo': [
+                         {'@_fa': 'true', 'docType': 'all', 'scholarlyOutput': str(1000 + year % 10),
+                          'citationCount': str(2900 + year % 10), 'citeScore': '2.9%i' %(year % 10),
+                          'percentCited': '76',
+                          'citeScoreSubjectRank': [
+                              {'@_fa': 'true', 'subjectCode': '3309', 'rank': str(5 + year % 3),
+                               'percentile': str(90 + year % 5)},
+                              {'@_fa': 'true', 'subjectCode': '1706', 'rank': str(40 + year % 4),
+                               'percentile': str(70 + year % 5)}]}]}]}
+                    for year in range(2015, 2019)]},
+            'link': [{'@_fa': 'true', '@ref': 'scopus-source',
+                      '@href': 'https://www.scopus.com/source/sourceInfo.url?sourceId=23925'}],
+            'prism:url': 'https://api.elsevier.com/content/serial/title/issn/%s' %issn}
+
+def affiliation_response(aff_id):
+    return {'affiliation-retrieval-response': {
+        'coredata': {'prism:url': 'https://api.elsevier.com/content/affiliation/affiliation_id/%s'
+                                  %aff_id,
+                     'dc:identifier': 'AFFILIATION_ID:%s' %aff_id,
+                     'eid': '10-s2.0-%s' %aff_id, 'document-count': '52000'},
+        'affiliation-name': 'University of Iowa', 'address': 'Iowa City, IA',
+        'city': 'Iowa City', 'country': 'United States',
+        'institution-profile': {'org-type': 'univ', 'org-domain': 'uiowa.edu',
+                                'org-URL': 'http://www.uiowa.edu',
+                                'date-created': {'@day': '14', '@month': '03', '@year': '2008'}}}}
+
+def not_found(message):
+    return {'service-error': {'status': {'statusCode': 'RESOURCE_NOT_FOUND',
+                                         'statusText': message}}}
+
+class ScopusStub(object):
+    '''
+        Stand-in for the Scopus APIs, with the `get(url, params=None)`
+        interface of pyscopus transports.
+
+        Article searches are answered from corpus, {query: list of search
+        entries}, with offset or cursor pagination, the page size limit of
+        each view, field restriction and "AND LOAD-DATE AFT yyyymmdd"
+        clauses (compared with the '_load_date' of the entries). Every
+        request is appended to requests.
+    '''
+
+    def __init__(self, corpus=None):
+        if corpus is None:
+            corpus = {QUERY: [article_entry(i) for i in range(N_ARTICLES)]}
+        self.corpus = corpus
+        self.requests = list()
+
+    def _response(self, js, status_code=200):
+        return RecordedResponse('', status_code, dict(HEADERS), json.dumps(js))
+
+    def get(self, url, params=None):
+        params = dict(params or {})
+        self.requests.append((url, params))
+        if url == APIURI.SEARCH:
+            return self._response(self._search(params))
+        if url == APIURI.SEARCH_AUTHOR:
+            return self._response(self._search_author(params))
+        if url.startswith(APIURI.AUTHOR + '/'):
+            author_id = url.split('/')[-1]
+            if author_id == MISSING_AUTHOR_ID:
+                return self._response(not_found('Author not found'), 404)
+            return self._response({'author-retrieval-response':
+                                   [author_retrieval_response(author_id)]})
+        if url == APIURI.AUTHOR_MULTI:
+            return self._response({'author-retrieval-response-list': {'author-retrieval-response': [
+                author_retrieval_response(author_id) if author_id != MISSING_AUTHOR_ID
+                else {'@status': 'not_found', '@_fa': 'true'}
+                for author_id in params['author_id'].split(',')]}})
+        if url.startswith(APIURI.ABSTRACT + '/'):
+            scopus_id = url.split('/')[-1]
+            if scopus_id == MISSING_SCOPUS_ID:
+                return self._response(not_found('The resource specified cannot be found.'), 404)
+            return self._response(abstract_response(scopus_id))
+        if url == APIURI.CITATION:
+            year_range = [int(year) for year in params['date'].split('-')]
+            return self._response(citation_response(params['scopus_id'].split(','), year_range))
+        if url.startswith(APIURI.SERIAL_RETRIEVAL):
+            return self._response({'serial-metadata-response':
+                                   {'entry': [serial_entry(url[len(APIURI.SERIAL_RETRIEVAL):])]}})
+        if url == APIURI.SERIAL_SEARCH:
+            # the same journal listed twice, as happens with title searches
+            return self._response({'serial-metadata-response':
+                                   {'entry': [serial_entry(ISSN), serial_entry(ISSN)]}})
+        if url.startswith(APIURI.FULL_TEXT + '/eid/'):
+            eid = url.split('/')[-1]
+            if eid.endswith(MISSING_SCOPUS_ID):
+                return self._response(not_found('The resource specified cannot be found.'), 404)
+            return self._response({'full-text-retrieval-response':
+                                   {'originalText': 'Full text of %s' %eid}})
+        if url.startswith(APIURI.AFFL_RETRIEVAL):
+            return self._response(affiliation_response(url[len(APIURI.AFFL_RETRIEVAL):]))
+        return self._response(not_found('Unknown resource'), 404)
+
+    def _matches(self, query):
+        load_date = None
+        for date_field in ('ORIG-LOAD-DATE', 'LOAD-DATE'):
+            clause = ' AND %s AFT ' %date_field
+            if clause in query:
+                query, load_date = query.split(clause)
+                break
+        entries = self.corpus.get(query, list())
+        if load_date is not None:
+            entries = [entry for entry in entries if entry['_load_date'] > load_date]
+        return entries
+
+    def _search(self, params):
+        entries = self._matches(params['query'])
+        max_count = 25 if params.get('view') == 'COMPLETE' else 200
+        count = min(int(params.get('count', 25)), max_count)
+        cursor = params.get('cursor')
+        if cursor is not None:
+            start = 0 if cursor == '*' else int(cursor[1:])
+        else:
+            start = int(params.get('start', 0))
+        page_entries = entries[start:start+count]
+        if 'field' in params:
+            fields = params['field'].split(',') + ['_load_date']
+            page_entries = [{key: value for key, value in entry.items() if key in fields}
+                            for entry in page_entries]
+        next_cursor = None
+        if cursor is not None:
+            # the last page points to itself
+            next_cursor = 'c%i' %min(start + count, len(entries)) if page_entries else cursor
+        return search_page(page_entries, len(entries), start, cursor, next_cursor)
+
+    def _search_author(self, params):
+        entries = [author_entry(i) for i in range(N_AUTHORS)] if params['query'] == AUTHOR_QUERY\
+                  else list()
+        start = int(params.get('start', 0))
+        count = min(int(params.get('count', 25)), 200)
+        return search_page(entries[start:start+count], len(entries), start)
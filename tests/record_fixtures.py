@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+'''
+    Record the fixtures replayed by the tests and benchmarks.
+
+    Every request made by record() is sent through a RecordingTransport and
+    saved under the fixture directory (one file per URL and parameters, api
+    key excluded), to be served later by ReplayTransport.
+
+    By default the responses come from payloads.ScopusStub, which is how
+    tests/fixtures was made:
+
+        python tests/record_fixtures.py
+
+    With an api key, the same requests are sent to Scopus and the real
+    responses are saved elsewhere, e.g. to run the benchmarks on them
+    (the tests assert the content of the synthetic fixtures):
+
+        python tests/record_fixtures.py --apikey KEY --path /tmp/scopus_fixtures
+'''
+
+import argparse, os, shutil, sys, warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyscopus import Scopus
+from pyscopus.transport import RecordingTransport, Transport
+from payloads import ScopusStub, QUERY, EMPTY_QUERY, N_ARTICLES, AUTHOR_QUERY, N_AUTHORS,\
+        AUTHOR_IDS, MISSING_AUTHOR_ID, SCOPUS_IDS, MISSING_SCOPUS_ID, YEAR_RANGE, SERIAL_TITLE,\
+        ISSN, AFFILIATION_ID
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def record(scopus):
+    ''' the requests covered by the fixtures '''
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        scopus.search(QUERY, count=N_ARTICLES)
+        scopus.search(QUERY, count=N_ARTICLES, cursor=True)
+        scopus.search(EMPTY_QUERY)
+        scopus.search_author(AUTHOR_QUERY, count=N_AUTHORS)
+        for author_id in AUTHOR_IDS[:3] + [MISSING_AUTHOR_ID]:
+            try:
+                scopus.retrieve_author(author_id)
+            except ValueError:
+                pass
+        scopus.retrieve_authors(AUTHOR_IDS + [MISSING_AUTHOR_ID])
+        scopus.retrieve_abstracts(SCOPUS_IDS[:5] + [MISSING_SCOPUS_ID])
+        scopus.retrieve_citation(SCOPUS_IDS[:30] + [MISSING_SCOPUS_ID], YEAR_RANGE)
+        scopus.search_serial(SERIAL_TITLE)
+        scopus.retrieve_serial(ISSN)
+        scopus.retrieve_affiliation(AFFILIATION_ID)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--apikey', help='record real Scopus responses with this key')
+    parser.add_argument('--path', default=FIXTURE_PATH, help='fixture directory')
+    args = parser.parse_args()
+
+    if args.apikey is not None and os.path.abspath(args.path) == FIXTURE_PATH:
+        parser.error('real responses do not match the tests, give another --path')
+    if os.path.exists(args.path):
+        shutil.rmtree(args.path)
+    transport = ScopusStub() if args.apikey is None else Transport(rate_limit=5)
+    scopus = Scopus(args.apikey or 'replay', transport=RecordingTransport(args.path, transport),
+                    output='raw')
+    record(scopus)
+    print('%i fixtures written to %s' %(len(os.listdir(args.path)), args.path))
+
+if __name__ == '__main__':
+    main()
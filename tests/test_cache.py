@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import threading, time
+import pytest
+from pyscopus import cache as cache_module
+from pyscopus.cache import ResponseCache, SingleFlight, MemoryCache
+from pyscopus.metrics import Metrics
+from pyscopus.transport import ReplayTransport
+from conftest import CountingTransport
+from record_fixtures import FIXTURE_PATH
+from payloads import AUTHOR_IDS, SCOPUS_IDS, AFFILIATION_ID, ISSN
+
+def test_response_cache_hit(make_scopus, replay):
+    transport = CountingTransport(replay)
+    metrics = Metrics()
+    response_cache = ResponseCache(':memory:')
+    scopus = make_scopus(transport, cache=response_cache, metrics=metrics)
+    first = scopus.retrieve_abstract(SCOPUS_IDS[0])
+    second = scopus.retrieve_abstract(SCOPUS_IDS[0])
+    assert first == second
+    assert len(transport.requests) == 1
+    assert response_cache.stats()['abstract'] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+    assert sum(d.get('cache_hits_total', 0) for d in metrics.summary().values()) == 1
+
+def test_response_cache_ignores_api_key():
+    response_cache = ResponseCache(':memory:')
+    response_cache.set('author', 'url', {'apikey': 'k1', 'view': 'STANDARD'}, {'a': 1})
+    assert response_cache.get('author', 'url', {'apikey': 'k2', 'view': 'STANDARD'}) == {'a': 1}
+    assert response_cache.get('author', 'url', {'apikey': 'k1', 'view': 'FULL'}) is None
+
+def test_response_cache_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    response_cache = ResponseCache(':memory:', ttl={'author': 10})
+    response_cache.set('author', 'url', None, {'a': 1})
+    response_cache.set('abstract', 'url', None, {'b': 1})
+    now[0] += 11
+    assert response_cache.get('author', 'url') is None
+    # no ttl for this endpoint
+    assert response_cache.get('abstract', 'url') == {'b': 1}
+
+def test_response_cache_evicts_least_recently_used(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    response_cache = ResponseCache(':memory:', max_size=2*len('{"a": 0}'))
+    for i in range(2):
+        response_cache.set('author', 'url%i' %i, None, {'a': i})
+        now[0] += 1
+    assert response_cache.get('author', 'url0') == {'a': 0}
+    now[0] += 1
+    response_cache.set('author', 'url2', None, {'a': 2})
+    assert response_cache.get('author', 'url1') is None
+    assert response_cache.get('author', 'url0') == {'a': 0}
+    assert response_cache.get('author', 'url2') == {'a': 2}
+
+def test_single_flight_shares_call():
+    single_flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = list(), list()
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return object()
+
+    def run():
+        results.append(single_flight.do('key', fn))
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    while single_flight.shared < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_single_flight_shares_error():
+    single_flight = SingleFlight()
+    with pytest.raises(KeyError):
+        single_flight.do('key', lambda: {}['missing'])
+    # nothing kept once the call has finished
+    assert single_flight.do('key', lambda: 1) == 1
+
+def test_coalesce_concurrent_calls(make_scopus):
+    transport = CountingTransport(ReplayTransport(FIXTURE_PATH, latency=0.2))
+    scopus = make_scopus(transport, coalesce=True)
+    results = list()
+    threads = [threading.Thread(target=lambda: results.append(scopus.retrieve_author(AUTHOR_IDS[0])))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(transport.requests) == 1
+    assert all(result is results[0] for result in results)
+    assert scopus.single_flight.shared == 3
+
+def test_memory_cache(make_scopus, replay):
+    transport = CountingTransport(replay)
+    memo = MemoryCache(max_size=2)
+    scopus = make_scopus(transport, memo=memo)
+    author = scopus.retrieve_author(AUTHOR_IDS[0])
+    assert scopus.retrieve_author(AUTHOR_IDS[0]) is author
+    assert len(transport.requests) == 1
+    scopus.retrieve_affiliation(AFFILIATION_ID)
+    scopus.retrieve_serial(ISSN)
+    # max_size 2: the author was evicted
+    assert len(memo) == 2
+    scopus.retrieve_author(AUTHOR_IDS[0])
+    assert len(transport.requests) == 4
+    assert memo.stats()['retrieve_author'] == {'hits': 1, 'misses': 2, 'hit_rate': 1/3.}
+
+def test_memory_cache_invalidate(make_scopus, replay):
+    transport = CountingTransport(replay)
+    memo = MemoryCache()
+    scopus = make_scopus(transport, memo=memo)
+    scopus.retrieve_author(AUTHOR_IDS[0])
+    memo.invalidate(scopus.retrieve_author, author_id=AUTHOR_IDS[0])
+    scopus.retrieve_author(AUTHOR_IDS[0])
+    assert len(transport.requests) == 2
+
+def test_memory_cache_call_shapes(make_scopus, replay):
+    transport = CountingTransport(replay)
+    memo = MemoryCache()
+    scopus = make_scopus(transport, memo=memo)
+    affiliation = scopus.retrieve_affiliation(AFFILIATION_ID)
+    assert scopus.retrieve_affiliation(AFFILIATION_ID, 'STANDARD') is affiliation
+    assert scopus.retrieve_affiliation(view='STANDARD', aff_id=AFFILIATION_ID) is affiliation
+    assert len(transport.requests) == 1 and len(memo) == 1
+    # output is part of the key
+    raw = make_scopus(transport, memo=memo, output='raw').retrieve_affiliation(AFFILIATION_ID)
+    assert raw is not affiliation
+    assert len(transport.requests) == 2 and len(memo) == 2
+    memo.invalidate(scopus.retrieve_affiliation, AFFILIATION_ID, view='STANDARD')
+    assert len(memo) == 1
+    scopus.retrieve_affiliation(AFFILIATION_ID)
+    assert len(transport.requests) == 3
+
+def test_memory_cache_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    memo = MemoryCache(ttl=10)
+    key = ('retrieve_author', '1')
+    memo.set(key, 'author')
+    assert memo.get(key) == (True, 'author')
+    now[0] += 11
+    assert memo.get(key) == (False, None)
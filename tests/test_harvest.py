@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import json, os
+import pytest
+import pandas as pd
+from pyscopus.harvest import HarvestJob
+from conftest import CountingTransport, FailingTransport
+from payloads import QUERY, EMPTY_QUERY, N_ARTICLES, SCOPUS_IDS, AUTHOR_QUERY, N_AUTHORS
+
+@pytest.mark.parametrize('cursor', [False, True])
+def test_harvest_same_as_search(make_scopus, tmp_path, cursor):
+    scopus = make_scopus()
+    for count in (30, N_ARTICLES):
+        df = scopus.harvest(QUERY, str(tmp_path / ('job%i' %count)), count=count, workers=2,
+                            cursor=cursor)
+        expected = scopus.search(QUERY, count=count)
+        pd.testing.assert_frame_equal(df, expected)
+        assert df['scopus_id'].tolist() == SCOPUS_IDS[:count]
+    # missing values stay None and counts int, as in search
+    assert df['isbn'].isna().sum() == expected['isbn'].isna().sum() > 0
+    assert df['affiliation'][0] is None
+    assert str(df['citation_count'].dtype) == str(expected['citation_count'].dtype)
+
+def test_harvest_empty(make_scopus, tmp_path):
+    scopus = make_scopus()
+    df = scopus.harvest(EMPTY_QUERY, str(tmp_path / 'job'))
+    expected = scopus.search(EMPTY_QUERY)
+    assert len(df) == len(expected) == 0
+    assert list(df.columns) == list(expected.columns)
+
+def test_harvest_author_same_as_search(make_scopus, tmp_path):
+    scopus = make_scopus()
+    df = scopus.harvest(AUTHOR_QUERY, str(tmp_path / 'job'), count=N_AUTHORS, type_=2)
+    pd.testing.assert_frame_equal(df, scopus.search_author(AUTHOR_QUERY, count=N_AUTHORS))
+
+@pytest.mark.parametrize('cursor', [False, True])
+def test_harvest_resume(make_scopus, replay, tmp_path, cursor):
+    path = str(tmp_path / 'job')
+    # the connection drops on the second page
+    failing = FailingTransport(replay, fail_at=1)
+    with pytest.raises(ConnectionError):
+        HarvestJob(make_scopus(failing), path, QUERY, count=N_ARTICLES, cursor=cursor).run()
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    assert manifest['pages'] == [0] and not manifest['done']
+
+    transport = CountingTransport(replay)
+    job = HarvestJob(make_scopus(transport), path, QUERY, count=N_ARTICLES, cursor=cursor)
+    df = job.run()
+    assert job.done
+    assert df['scopus_id'].tolist() == SCOPUS_IDS
+    # only the two missing pages were requested
+    assert len(transport.requests) == 2
+
+    # a finished job sends no request
+    transport = CountingTransport(replay)
+    df = HarvestJob(make_scopus(transport), path, QUERY, count=N_ARTICLES, cursor=cursor).run()
+    assert len(df) == N_ARTICLES
+    assert len(transport.requests) == 0
+
+def test_harvest_other_job_rejected(make_scopus, tmp_path):
+    path = str(tmp_path / 'job')
+    make_scopus().harvest(QUERY, path, count=30)
+    with pytest.raises(ValueError):
+        make_scopus().harvest(QUERY, path, count=N_ARTICLES)
+
+def test_harvest_cursor_author_rejected(make_scopus, tmp_path):
+    path = str(tmp_path / 'job')
+    with pytest.raises(ValueError):
+        HarvestJob(make_scopus(), path, AUTHOR_QUERY, type_=2, cursor=True)
+    assert not os.path.exists(path)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from pyscopus.index import LocalIndex
+from pyscopus.sync import AuthorSync
+from payloads import ScopusStub, QUERY, N_ARTICLES, SCOPUS_IDS, AUTHOR_IDS, article_entry
+
+@pytest.fixture
+def index(make_scopus):
+    index = LocalIndex()
+    assert make_scopus().search_to_index(QUERY, index, count=N_ARTICLES) == N_ARTICLES
+    return index
+
+def test_index_query(index):
+    assert len(index) == N_ARTICLES
+    # ISSN with or without dash, against ISSN and eISSN
+    assert index.count(issn='0138-9130') == N_ARTICLES // 2
+    assert index.count(issn='1875-5879') == N_ARTICLES // 2
+    assert index.ids(year=2011) == sorted(SCOPUS_IDS[1::10])
+    assert index.count(since=2015, until=2016) == 12
+    assert index.count(subtype='Review') == N_ARTICLES // 4
+    assert index.ids(doi='10.1007/S11192-011-0001-X') == [SCOPUS_IDS[1]]
+    # affiliations are None when absent (every 9th) or incomplete (every 6th)
+    assert index.count(affiliation='leiden university') == len([i for i in range(N_ARTICLES)
+                                                                if i % 9 and i % 6 and i % 4 >= 1])
+
+def test_index_query_output(index):
+    df = index.query(author_id=AUTHOR_IDS[1])
+    records = index.query(output='records', author_id=AUTHOR_IDS[1])
+    raw = index.query(output='raw', author_id=AUTHOR_IDS[1])
+    assert df['scopus_id'].tolist() == [record.scopus_id for record in records] ==\
+           [row['scopus_id'] for row in raw]
+    assert all(AUTHOR_IDS[1] in row['authors'] for row in raw)
+
+def test_index_coauthors(index):
+    coauthors = index.coauthors(AUTHOR_IDS[1])
+    expected = dict()
+    for i in range(N_ARTICLES):
+        authors = [author.get('authid') for author in article_entry(i)['author']]
+        # the author list is empty when an author has no authid
+        if AUTHOR_IDS[1] in authors and None not in authors:
+            for author_id in set(authors) - {AUTHOR_IDS[1]}:
+                expected[author_id] = expected.get(author_id, 0) + 1
+    assert coauthors == expected
+    assert list(coauthors.values()) == sorted(coauthors.values(), reverse=True)
+
+def test_index_replaces_articles(index, make_scopus):
+    make_scopus().search_to_index(QUERY, index, count=N_ARTICLES)
+    assert len(index) == N_ARTICLES
+
+def test_index_citation_counts(index):
+    assert index.set_citation_counts({SCOPUS_IDS[1]: 37, SCOPUS_IDS[2]: 500, '1': 3}) == 1
+    assert index.query(output='raw', doi='10.1007/s11192-012-0002-x')[0]['citation_count'] == 500
+
+def test_index_rejects_author_search(make_scopus):
+    with pytest.raises(ValueError):
+        LocalIndex().add(make_scopus(output='raw').search_author('AUTHLASTNAME(Zuo)', count=5))
+
+def author_corpus(entries):
+    return {'au-id(%s)' %author_id: [entry for entry in entries
+                                     if author_id in [author.get('authid') for author in entry['author']]]
+            for author_id in AUTHOR_IDS}
+
+def test_author_sync(tmp_path):
+    from pyscopus import Scopus
+    entries = [article_entry(i) for i in range(N_ARTICLES)]
+    stub = ScopusStub(author_corpus(entries))
+    index = LocalIndex()
+    path = str(tmp_path / 'sync.json')
+    author_sync = AuthorSync(Scopus('stub', transport=stub), index, path)
+
+    results = author_sync.sync_all(AUTHOR_IDS[:2], workers=2)
+    n_documents = len(stub.corpus['au-id(%s)' %AUTHOR_IDS[1]])
+    assert results[AUTHOR_IDS[1]] == {'full': True, 'added': n_documents, 'citations_updated': 0}
+    assert len(author_sync.publications(AUTHOR_IDS[1])) == n_documents
+
+    # a new document and a changed citation count
+    entries.append(article_entry(N_ARTICLES + 1, load_date='29990101'))
+    entries[1]['citedby-count'] = '1000'
+    stub.corpus = author_corpus(entries)
+    # state is reloaded from the file
+    author_sync = AuthorSync(Scopus('stub', transport=stub), index, path)
+    n_requests = len(stub.requests)
+    result = author_sync.sync(AUTHOR_IDS[1], refresh_citations=True)
+    assert result == {'full': False, 'added': 1, 'citations_updated': 1}
+    # one page of ids and counts for the whole bibliography
+    refresh = [params for url, params in stub.requests[n_requests:] if 'field' in params]
+    assert len(refresh) == 1 and refresh[0]['count'] == 200
+    assert len(author_sync.publications(AUTHOR_IDS[1])) == n_documents + 1
+    assert index.query(output='raw', doi=entries[1]['prism:doi'])[0]['citation_count'] == 1000
+
+def test_author_sync_citation_pages(tmp_path):
+    from pyscopus import Scopus
+    entries = [article_entry(i) for i in range(450)]
+    stub = ScopusStub({'au-id(%s)' %AUTHOR_IDS[0]: entries})
+    author_sync = AuthorSync(Scopus('stub', transport=stub), LocalIndex(), str(tmp_path / 'sync.json'))
+    counts = author_sync._citation_counts('au-id(%s)' %AUTHOR_IDS[0])
+    assert len(counts) == 450
+    assert counts[SCOPUS_IDS[2]] == 74
+    assert [params['count'] for url, params in stub.requests] == [200, 200, 200]
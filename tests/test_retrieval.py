@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import json, os
+import pytest
+from pyscopus import APIURI, Scopus, citations
+from pyscopus.metrics import Metrics
+from pyscopus.transport import ScopusHTTPError
+from pyscopus.records import AuthorProfile, Abstract, Affiliation, CitationRow
+from payloads import AUTHOR_IDS, MISSING_AUTHOR_ID, SCOPUS_IDS, MISSING_SCOPUS_ID, NO_COUNT_IDS,\
+        YEAR_RANGE, SERIAL_TITLE, ISSN, AFFILIATION_ID, ScopusStub, cite_info
+
+def test_retrieve_author(make_scopus):
+    author = make_scopus().retrieve_author(AUTHOR_IDS[1])
+    assert author['author-id'] == AUTHOR_IDS[1]
+    assert author['name'] == 'Zhiya1 Zuo'
+    assert author['publication-range'] == ('2019', '2011')
+
+def test_retrieve_author_records(make_scopus):
+    author = make_scopus(output='records').retrieve_author(AUTHOR_IDS[1])
+    assert isinstance(author, AuthorProfile)
+    assert author.document_count == '11'
+
+def test_retrieve_author_not_found(make_scopus):
+    with pytest.raises(ValueError):
+        make_scopus().retrieve_author(MISSING_AUTHOR_ID)
+
+def test_retrieve_authors(make_scopus):
+    with pytest.warns(UserWarning, match='1 of 13 authors not found'):
+        df = make_scopus().retrieve_authors(AUTHOR_IDS + [MISSING_AUTHOR_ID])
+    assert df['author-id'].tolist() == AUTHOR_IDS
+
+def test_retrieve_abstracts(make_scopus, tmp_path):
+    download_path = str(tmp_path / 'abstracts')
+    df, failed_df = make_scopus().retrieve_abstracts(SCOPUS_IDS[:5] + [MISSING_SCOPUS_ID],
+                                                     download_path=download_path, workers=3)
+    assert df['scopus-id'].tolist() == SCOPUS_IDS[:5]
+    assert failed_df['scopus_id'].tolist() == [MISSING_SCOPUS_ID]
+    assert failed_df['status'].tolist() == [404]
+    assert sorted(os.listdir(download_path)) == sorted(scopus_id + '.json'
+                                                       for scopus_id in SCOPUS_IDS[:5])
+    with open(os.path.join(download_path, SCOPUS_IDS[0] + '.json')) as f:
+        assert 'abstracts-retrieval-response' in json.load(f)
+
+def test_retrieve_abstract_records(make_scopus):
+    abstract = make_scopus(output='records').retrieve_abstract(SCOPUS_IDS[2])
+    assert isinstance(abstract, Abstract)
+    assert abstract.scopus_id == SCOPUS_IDS[2]
+    assert abstract.pubmed_id == '29000002'
+
+def test_retrieve_citation(make_scopus):
+    scopus_id_list = SCOPUS_IDS[:30] + [MISSING_SCOPUS_ID]
+    with pytest.warns(UserWarning, match='2 of 31 scopus ids missing'):
+        df = make_scopus().retrieve_citation(scopus_id_list, YEAR_RANGE)
+    expected = [scopus_id for scopus_id in SCOPUS_IDS[:30] if scopus_id not in NO_COUNT_IDS]
+    assert df['scopus_id'].tolist() == expected
+    info = cite_info(SCOPUS_IDS[3], YEAR_RANGE)
+    row = df.set_index('scopus_id').loc[SCOPUS_IDS[3]]
+    assert [int(row[str(year)]) for year in range(YEAR_RANGE[0], YEAR_RANGE[1]+1)] ==\
+           [int(count['$']) for count in info['cc']]
+    assert int(row['total_citation']) == int(info['rowTotal'])
+
+def test_retrieve_citation_records(make_scopus):
+    with pytest.warns(UserWarning):
+        rows = make_scopus(output='records').retrieve_citation(SCOPUS_IDS[:30] + [MISSING_SCOPUS_ID],
+                                                               YEAR_RANGE)
+    assert all(isinstance(row, CitationRow) for row in rows)
+    assert len(rows) == 29
+    info = cite_info(SCOPUS_IDS[3], YEAR_RANGE)
+    assert rows[3].counts == tuple(count['$'] for count in info['cc'])
+
+def test_retrieve_citation_panel(make_scopus):
+    scopus_id_list = SCOPUS_IDS[:30] + [MISSING_SCOPUS_ID]
+    scopus = make_scopus()
+    with pytest.warns(UserWarning):
+        df = scopus.retrieve_citation(scopus_id_list, YEAR_RANGE)
+    with pytest.warns(UserWarning, match='2 of 31'):
+        panel = scopus.retrieve_citation_panel(scopus_id_list, YEAR_RANGE)
+    assert str(panel.values.dtype) == 'int64'
+    assert (panel.values == df.set_index('scopus_id').astype('int64').values).all()
+    assert citations.h_index(panel) == citations._h_index(panel[['total_citation']].values)[0]
+
+def test_search_serial_deduplicated(make_scopus):
+    meta_df, citescore_df, rank_df = make_scopus().search_serial(SERIAL_TITLE)
+    assert len(meta_df) == 1
+    assert meta_df['subject-area'][0] == ['3309', '1706']
+    assert citescore_df['year'].tolist() == ['2015', '2016', '2017', '2018']
+    assert len(rank_df) == 8
+
+def test_retrieve_serial_raw(make_scopus):
+    meta_list, citescore_list, rank_list = make_scopus(output='raw').retrieve_serial(ISSN)
+    assert meta_list[0]['prism:issn'] == ISSN.replace('-', '')
+    assert all(d['source-id'] == '23925' for d in citescore_list + rank_list)
+
+def test_retrieve_affiliation(make_scopus):
+    affiliation = make_scopus(output='records').retrieve_affiliation(AFFILIATION_ID)
+    assert isinstance(affiliation, Affiliation)
+    assert affiliation.aff_id == AFFILIATION_ID
+    assert affiliation.city == 'Iowa City'
+    assert affiliation.date_created == '14/03/2008'
+
+def test_retrieve_full_text():
+    metrics = Metrics()
+    scopus = Scopus('stub', transport=ScopusStub(), metrics=metrics)
+    link = '%s/eid/1-s2.0-%s' %(APIURI.FULL_TEXT, SCOPUS_IDS[1])
+    assert scopus.retrieve_full_text(link) == 'Full text of 1-s2.0-%s' %SCOPUS_IDS[1]
+    with pytest.raises(ScopusHTTPError) as e:
+        scopus.retrieve_full_text('%s/eid/1-s2.0-%s' %(APIURI.FULL_TEXT, MISSING_SCOPUS_ID))
+    assert e.value.status_code == 404
+    assert metrics.counters[('requests_total', 'full_text')] == 2
+    assert metrics.counters[('errors_total', 'full_text')] == 1
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import pytest
+from pyscopus import AsyncScopus
+from pyscopus.records import Article, Author
+from conftest import AsyncReplaySession
+from payloads import QUERY, EMPTY_QUERY, N_ARTICLES, AUTHOR_QUERY, N_AUTHORS, SCOPUS_IDS,\
+        AUTHOR_IDS, AFFILIATIONS
+
+def test_search_offset_pages(make_scopus, replay):
+    df = make_scopus().search(QUERY, count=N_ARTICLES)
+    assert list(df.columns) == list(Article.columns)
+    assert list(df['scopus_id']) == SCOPUS_IDS
+    row = df.iloc[1]
+    assert row['title'] == 'Indicators of research performance, part 1'
+    assert row['citation_count'] == 37
+    assert row['authors'] == AUTHOR_IDS[1:3]
+    assert row['affiliation'] == [dict(zip(('name', 'city', 'country'), AFFILIATIONS[0])),
+                                  dict(zip(('name', 'city', 'country'), AFFILIATIONS[1]))]
+    assert row['full_text'].endswith('1-s2.0-85000000001')
+
+def test_search_count_truncates(make_scopus):
+    df = make_scopus().search(QUERY, count=30)
+    assert list(df['scopus_id']) == SCOPUS_IDS[:30]
+
+def test_search_workers_same_result(make_scopus):
+    scopus = make_scopus()
+    sequential = scopus.search(QUERY, count=N_ARTICLES)
+    concurrent = scopus.search(QUERY, count=N_ARTICLES, workers=3)
+    assert sequential.equals(concurrent)
+
+def test_search_cursor_same_as_offset(make_scopus):
+    scopus = make_scopus()
+    offset = scopus.search(QUERY, count=N_ARTICLES)
+    cursor = scopus.search(QUERY, count=N_ARTICLES, cursor=True)
+    assert offset.equals(cursor)
+
+def test_iter_search_pages(make_scopus):
+    sizes = [len(page_df) for page_df in make_scopus().iter_search(QUERY, count=N_ARTICLES)]
+    assert sizes == [25, 25, 10]
+
+def test_search_output_modes(make_scopus):
+    df = make_scopus().search(QUERY, count=N_ARTICLES)
+    records = make_scopus(output='records').search(QUERY, count=N_ARTICLES)
+    raw = make_scopus(output='raw').search(QUERY, count=N_ARTICLES)
+    assert all(isinstance(record, Article) for record in records)
+    assert [record.to_dict() for record in records] == raw
+    assert [row['scopus_id'] for row in raw] == list(df['scopus_id'])
+    assert [row['title'] for row in raw] == list(df['title'])
+
+def test_search_empty(make_scopus):
+    assert len(make_scopus().search(EMPTY_QUERY)) == 0
+    assert make_scopus(output='raw').search(EMPTY_QUERY) == []
+
+def test_search_author(make_scopus):
+    df = make_scopus().search_author(AUTHOR_QUERY, count=N_AUTHORS)
+    assert list(df.columns) == list(Author.columns)
+    assert len(df) == N_AUTHORS
+    assert df['document_count'].tolist() == [3 + i for i in range(N_AUTHORS)]
+    assert df['affiliation'].isna().sum() == N_AUTHORS // 4 + 1
+
+def test_search_author_cursor_rejected(make_scopus):
+    with pytest.raises(ValueError):
+        make_scopus().search(AUTHOR_QUERY, type_=2, cursor=True)
+    with pytest.raises(ValueError):
+        make_scopus().iter_search(AUTHOR_QUERY, type_=2, cursor=True)
+
+def test_async_search_same_as_search(make_scopus, replay):
+    df = make_scopus().search(QUERY, count=N_ARTICLES)
+    for cursor in (False, True):
+        scopus = AsyncScopus('replay', session=AsyncReplaySession(replay))
+        assert asyncio.run(scopus.search(QUERY, count=N_ARTICLES, cursor=cursor)).equals(df)
+
+def test_async_search_author_cursor_rejected(replay):
+    session = AsyncReplaySession(replay)
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncScopus('replay', session=session).search(AUTHOR_QUERY, type_=2, cursor=True))
+    assert session.requests == []
+
+def test_search_count_must_be_int(make_scopus):
+    with pytest.raises(ValueError):
+        make_scopus().search(QUERY, count='60')
+
+def test_search_missing_fixture(make_scopus):
+    # replay never goes to the network
+    with pytest.raises(KeyError):
+        make_scopus().search('TITLE(unrecorded)')
+
+def test_search_to_file(make_scopus, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'articles.parquet')
+    assert make_scopus().search_to_file(QUERY, path, count=N_ARTICLES) == N_ARTICLES
+    table = pq.read_table(path)
+    assert table.column('scopus_id').to_pylist() == SCOPUS_IDS
+    assert table.num_rows == N_ARTICLES
+
+def test_search_page_struct_same_as_dict():
+    msgspec = pytest.importorskip('msgspec')
+    import json, os
+    from pyscopus import APIURI
+    from pyscopus.decoding import search_page_decoder
+    from pyscopus.utils import _parse_search_page, _parse_search_page_struct
+    from record_fixtures import FIXTURE_PATH
+
+    pages = list()
+    for name in sorted(os.listdir(FIXTURE_PATH)):
+        with open(os.path.join(FIXTURE_PATH, name)) as f:
+            fixture = json.load(f)
+        if fixture['url'] == APIURI.SEARCH and fixture['status_code'] == 200:
+            pages.append(fixture['text'])
+    assert pages
+    decoder = search_page_decoder()
+    rows = list()
+    for text in pages:
+        for output in ('frame', 'records', 'raw'):
+            result, total, cursor = _parse_search_page(json.loads(text), 1, output)
+            struct_result, struct_total, struct_cursor = _parse_search_page_struct(
+                decoder.decode(text), output)
+            assert (struct_total, struct_cursor) == (total, cursor)
+            if output == 'frame':
+                assert struct_result.equals(result)
+            else:
+                assert struct_result == result
+        rows.extend(_parse_search_page_struct(decoder.decode(text), 'raw')[0])
+    # the recorded pages hold incomplete affiliations and authors without authid
+    assert any(row['affiliation'] is None for row in rows)
+    assert any(row['authors'] == [] for row in rows)
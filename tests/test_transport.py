@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import asyncio, os, time
+import pytest
+from pyscopus import APIURI, Scopus, AsyncScopus
+from pyscopus.metrics import Metrics, endpoint_of
+from pyscopus.transport import Transport, KeyPool, RateLimiter, ScopusHTTPError,\
+        RecordingTransport, ReplayTransport
+from conftest import ReplaySession, AsyncReplaySession, throttled
+from payloads import ScopusStub, AUTHOR_IDS, QUERY, N_ARTICLES
+
+def replay_transport(replay, respond=None, **kwargs):
+    ''' default transport whose HTTP session serves the fixtures '''
+    transport = Transport(**kwargs)
+    transport.session = ReplaySession(replay, respond)
+    return transport
+
+def first_responses(responses):
+    ''' respond with responses in turn, then with the fixtures '''
+    responses = list(responses)
+    def respond(url, params):
+        if responses:
+            return responses.pop(0)
+    return respond
+
+def test_retry_throttled(replay):
+    metrics = Metrics()
+    transport = replay_transport(replay, first_responses([throttled(0), throttled(0)]),
+                                 metrics=metrics)
+    author = Scopus('replay', transport=transport).retrieve_author(AUTHOR_IDS[0])
+    assert author['author-id'] == AUTHOR_IDS[0]
+    assert len(transport.session.requests) == 3
+    endpoint = endpoint_of(APIURI.AUTHOR + '/' + AUTHOR_IDS[0])
+    assert metrics.counters[('retries_total', endpoint)] == 2
+    assert metrics.gauges[('ratelimit_remaining', endpoint)] == 19000
+
+def test_retry_backoff_grows(replay, monkeypatch):
+    delays = list()
+    monkeypatch.setattr(RateLimiter, 'pause', lambda self, seconds: delays.append(seconds))
+    transport = replay_transport(replay, first_responses([throttled()]*3), backoff=1.0)
+    Scopus('replay', transport=transport).retrieve_author(AUTHOR_IDS[0])
+    # jittered exponential backoff: 1, 2, 4 seconds +-50%
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0.5 * 2**attempt <= delay <= 1.5 * 2**attempt
+
+def test_retries_exhausted(replay):
+    transport = replay_transport(replay, lambda url, params: throttled(0), max_retries=2)
+    with pytest.raises(ScopusHTTPError) as e:
+        Scopus('replay', transport=transport).search(QUERY)
+    assert e.value.status_code == 429
+    assert len(transport.session.requests) == 3
+
+def test_retry_after_longer_than_max_wait(replay, monkeypatch):
+    delays = list()
+    monkeypatch.setattr(RateLimiter, 'pause', lambda self, seconds: delays.append(seconds))
+    transport = replay_transport(replay, first_responses([throttled(3600)]))
+    with pytest.raises(ScopusHTTPError) as e:
+        Scopus('replay', transport=transport).retrieve_author(AUTHOR_IDS[0])
+    assert e.value.status_code == 429
+    assert len(transport.session.requests) == 1 and delays == []
+    # the exponential backoff is capped as well
+    transport = replay_transport(replay, first_responses([throttled()]*3), backoff=1.0,
+                                 rate_limit=RateLimiter(max_wait=2))
+    Scopus('replay', transport=transport).retrieve_author(AUTHOR_IDS[0])
+    assert len(delays) == 3 and max(delays) <= 2
+
+def test_async_retry_after_longer_than_max_wait(replay):
+    session = AsyncReplaySession(replay, first_responses([throttled(0), throttled(3600)]))
+    scopus = AsyncScopus('replay', session=session, max_wait=60)
+    with pytest.raises(ScopusHTTPError) as e:
+        asyncio.run(scopus.retrieve_author(AUTHOR_IDS[0]))
+    assert e.value.status_code == 429
+    assert len(session.requests) == 2
+
+def test_quota_exhausted_pauses():
+    limiter = RateLimiter(max_wait=60)
+    limiter.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(time.time() + 30)})
+    assert limiter.remaining == 0
+    assert 29 < limiter._paused_until - time.time() <= 30
+    # a reset further than max_wait is not waited for
+    limiter = RateLimiter(max_wait=10)
+    limiter.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(time.time() + 30)})
+    assert limiter._paused_until == 0
+
+def test_rate_limit():
+    limiter = RateLimiter(rate=100, burst=1)
+    start = time.time()
+    for _ in range(11):
+        limiter.acquire()
+    assert time.time() - start >= 0.09
+
+def test_key_pool_round_robin(replay):
+    scopus = Scopus(['k1', 'k2', 'k3'])
+    scopus.transport.session = ReplaySession(replay)
+    df = scopus.search(QUERY, count=N_ARTICLES)
+    assert len(df) == N_ARTICLES
+    for author_id in AUTHOR_IDS[:2]:
+        scopus.retrieve_author(author_id)
+    keys = [params['apikey'] for _, params in scopus.transport.session.requests]
+    assert keys == ['k1', 'k2', 'k3', 'k1', 'k2']
+    assert {key: usage['requests'] for key, usage in scopus.key_usage().items()} ==\
+           {'k1': 2, 'k2': 2, 'k3': 1}
+
+def test_key_pool_skips_throttled_key(replay):
+    def respond(url, params):
+        if params['apikey'] == 'k1':
+            return throttled(30)
+    scopus = Scopus(['k1', 'k2'], max_retries=3)
+    scopus.transport.session = ReplaySession(replay, respond)
+    for author_id in AUTHOR_IDS[:3]:
+        scopus.retrieve_author(author_id)
+    keys = [params['apikey'] for _, params in scopus.transport.session.requests]
+    # k1 is paused for 30 s after its 429, the retry and later requests use k2
+    assert keys == ['k1', 'k2', 'k2', 'k2']
+    usage = scopus.key_usage()
+    assert usage['k1']['throttled'] == 1 and not usage['k1']['available']
+    assert usage['k2']['throttled'] == 0 and usage['k2']['available']
+
+def test_key_pool_skips_used_up_quota():
+    pool = KeyPool(['k1', 'k2'])
+    pool.limiters['k1'].update({'X-RateLimit-Remaining': '0',
+                                'X-RateLimit-Reset': str(time.time() + 3600)})
+    assert [pool.select()[0] for _ in range(3)] == ['k2', 'k2', 'k2']
+    pool.add('k3')
+    assert [pool.select()[0] for _ in range(2)] == ['k2', 'k3']
+
+def test_key_pool_needs_default_transport(replay):
+    with pytest.raises(ValueError):
+        Scopus(['k1', 'k2'], transport=replay)
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / 'fixtures')
+    stub = ScopusStub()
+    recorded = Scopus('secret', transport=RecordingTransport(path, stub)).search(QUERY, count=30)
+    assert len(os.listdir(path)) == 2
+    for name in os.listdir(path):
+        with open(os.path.join(path, name)) as f:
+            assert 'secret' not in f.read()
+    replayed = Scopus('another key', transport=ReplayTransport(path)).search(QUERY, count=30)
+    assert recorded.equals(replayed)